@@ -0,0 +1,19 @@
+"""Shared fixtures for the bot workflow tests in the repository root"""
+
+import pytest
+
+from src.bot.bot import FiberInstallationBot
+from src.config import Config
+
+
+@pytest.fixture(scope="module")
+def bot(tmp_path_factory):
+    """Build the bot once per module against a throwaway session file"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(Config, 'SESSION_FILE_PATH', str(tmp_path_factory.mktemp("sessions") / "sessions.json"))
+        # No API calls are made here; the client just needs a key to construct
+        mp.setattr(Config, 'OPENAI_API_KEY', Config.OPENAI_API_KEY or "test-key")
+        bot = FiberInstallationBot()
+        yield bot
+        # Stop the session writer thread and drop its atexit hook
+        bot.session_manager.close()
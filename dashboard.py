@@ -47,16 +47,36 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 def load_sessions():
-    """Load session data from file"""
+    """Load session data from file (JSONL log, last record per phone wins)"""
     try:
         if os.path.exists('./data/sessions.json'):
             with open('./data/sessions.json', 'r') as f:
-                return json.load(f)
+                raw = f.read()
+            if raw[:2] in ('{\n', '{}'):
+                # Pre-JSONL format: one indented object of phone -> session
+                return json.loads(raw)
+            sessions = {}
+            for line in raw.splitlines():
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn append from a crash mid-write; the bot skips it too
+                    continue
+                sessions[record['phone']] = record['session']
+            return sessions
         return {}
     except Exception as e:
         st.error(f"Error loading sessions: {e}")
         return {}
 
+def count_completed_steps(session):
+    """Completed step count for a stored session (photo list, or the older step dict)"""
+    if 'completed_photos' in session:
+        return sum(1 for photo in session['completed_photos'] if photo is not None)
+    return len(session.get('completed_steps', {}))
+
 def load_verification_results():
     """Load verification results from photo directories"""
     results = []
@@ -163,7 +183,7 @@ def create_agent_performance_table(sessions):
             'Phone': phone,
             'Current Job': session.get('current_job_id', 'none'),
             'Current Step': session.get('current_step', 0),
-            'Completed Steps': len(session.get('completed_steps', {})),
+            'Completed Steps': count_completed_steps(session),
             'Status': session.get('status', 'unknown'),
             'Last Activity': session.get('last_activity', 'unknown')
         })
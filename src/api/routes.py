@@ -1,57 +1,157 @@
-from flask import Flask, request, Response, jsonify
+from flask import Flask, request, Response, jsonify, abort
+from werkzeug.exceptions import HTTPException
 import logging
 import os
+import tempfile
+from threading import Lock
 from typing import Dict, Any
+import msgspec
+import orjson
+from cachetools import TTLCache
 from ..bot.bot import FiberInstallationBot
+from ..bot.handlers import send_whatsapp_message
 from ..config import Config
-from ..db.database import save_installation, mark_resubmitted, test_connection
+from ..db.database import queue_installation, mark_resubmitted, test_connection
 
 logger = logging.getLogger(__name__)
 
 # Global bot instance
 bot_instance = None
+_bot_lock = Lock()
+
+# Recently handled webhooks keyed by (from_number, MessageSid). Twilio retries
+# a webhook on timeout/5xx; a retry that hits this cache is answered with the
+# TwiML we already produced (or an empty reply while the first is in flight)
+# instead of running the message through the bot a second time.
+_inflight = TTLCache(maxsize=10_000, ttl=30)
+_inflight_lock = Lock()
+
+
+class SubmitReq(msgspec.Struct):
+    """Request body for /api/submit-installation"""
+    drop_number: str
+    contractor_number: str = 'Unknown'
+    project_name: str = 'Velo Test'
+
+
+class ResubmitReq(msgspec.Struct):
+    """Request body for /api/resubmit"""
+    drop_number: str
+
+
+# Static part of the GET /admin/strictness response; only the current
+# threshold values change between requests
+_STRICTNESS_STATIC = {
+    "description": {
+        "passing_score_threshold": "Minimum score (0-10) for individual photos to pass",
+        "passing_completion_rate": "Minimum percentage (0-1) of steps that must be completed",
+        "minimum_passed_steps": "Minimum number of steps that must pass for overall approval"
+    },
+    "recommendations": {
+        "strict": {"passing_score_threshold": 9, "description": "Very strict - only excellent photos pass"},
+        "standard": {"passing_score_threshold": 8, "description": "Standard quality - good photos pass"},
+        "lenient": {"passing_score_threshold": 7, "description": "More lenient - acceptable photos pass"},
+        "testing": {"passing_score_threshold": 5, "description": "Testing mode - most photos pass"}
+    }
+}
+
+
+EMPTY_TWIML = """<?xml version="1.0" encoding="UTF-8"?>
+<Response></Response>"""
+
+# Reply wrapper; the bot hands back its message already UTF-8 encoded
+TWIML_HEAD = b'<?xml version="1.0" encoding="UTF-8"?>\n<Response>\n    <Message>'
+TWIML_TAIL = b'</Message>\n</Response>'
 
 def get_bot() -> FiberInstallationBot:
     """Get or create bot instance"""
     global bot_instance
-    if bot_instance is None:
-        bot_instance = FiberInstallationBot()
-    return bot_instance
+    bot = bot_instance
+    if bot is not None:
+        return bot
+    # Concurrent first requests must not each build their own bot
+    with _bot_lock:
+        if bot_instance is None:
+            bot_instance = FiberInstallationBot()
+        return bot_instance
 
 def register_routes(app: Flask):
-    """Register all API routes"""
+    """Register all API routes (the bot is built lazily by get_bot; the
+    production entry point, src/api/wsgi.py, warms it up)"""
+
+    @app.errorhandler(HTTPException)
+    def handle_http_error(e):
+        """Return HTTP errors (abort(), 404, 405...) as JSON"""
+        return jsonify({"error": e.description}), e.code
+
+    @app.errorhandler(Exception)
+    def handle_unexpected_error(e):
+        """Log any unhandled route error and return it as JSON"""
+        logger.exception("Unhandled error in %s %s", request.method, request.path)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
 
     @app.route('/webhook', methods=['POST'])
     def whatsapp_webhook():
         """Handle incoming WhatsApp messages from Twilio"""
+        key = None
         try:
             # Extract message data from Twilio request
             from_number = request.values.get('From', '')
             message_body = request.values.get('Body', '')
             media_url = request.values.get('MediaUrl0', '')
             media_id = request.values.get('MediaId0', '')
+            msg_sid = request.values.get('MessageSid', '')
+
+            # Twilio sends WhatsApp location shares as Latitude/Longitude params
+            location = None
+            if request.values.get('Latitude'):
+                location = {
+                    "latitude": request.values.get('Latitude'),
+                    "longitude": request.values.get('Longitude'),
+                    "address": request.values.get('Address'),
+                    "label": request.values.get('Label'),
+                }
+
+            # Collapse Twilio retries of a message we have already seen
+            if msg_sid:
+                key = (from_number, msg_sid)
+                with _inflight_lock:
+                    if key in _inflight:
+                        cached = _inflight[key]
+                        logger.info("Duplicate webhook for %s, skipping processing", msg_sid)
+                        return Response(cached or EMPTY_TWIML, mimetype='text/xml')
+                    _inflight[key] = None
 
-            logger.info(f"WhatsApp webhook: from={from_number}, body={message_body[:50]}..., media={bool(media_url)}")
+            logger.info("WhatsApp webhook: from=%s, body=%.50s..., media=%s", from_number, message_body, bool(media_url))
 
             # Process message through bot
             bot = get_bot()
-            response_message = bot.process_message(
+            response_message = bot.process_message_bytes(
                 from_number=from_number,
                 message_body=message_body,
                 media_url=media_url,
-                media_id=media_id
+                media_id=media_id,
+                location=location
             )
 
             # Format response for Twilio
-            twiml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Message>{response_message}</Message>
-</Response>"""
+            twiml_response = TWIML_HEAD + response_message + TWIML_TAIL
+
+            if key is not None:
+                with _inflight_lock:
+                    _inflight[key] = twiml_response
 
             return Response(twiml_response, mimetype='text/xml')
 
         except Exception as e:
-            logger.error(f"Error in WhatsApp webhook: {e}")
+            logger.error("Error in WhatsApp webhook: %s", e)
+            # Let a Twilio retry process the message again
+            if key is not None:
+                with _inflight_lock:
+                    _inflight.pop(key, None)
             # Return error message to user
             error_twiml = """<?xml version="1.0" encoding="UTF-8"?>
 <Response>
@@ -62,195 +162,157 @@ def register_routes(app: Flask):
     @app.route('/stats', methods=['GET'])
     def get_stats():
         """Get bot and system statistics"""
-        try:
-            bot = get_bot()
-            stats = bot.get_bot_stats()
-
-            # Add system stats
-            stats.update({
-                "api_status": "active",
-                "environment": Config.FLASK_ENV,
-                "openai_configured": bool(Config.OPENAI_API_KEY),
-                "twilio_configured": bool(Config.TWILIO_ACCOUNT_SID),
-                "photo_storage": Config.PHOTO_STORAGE_PATH,
-                "max_session_duration": f"{Config.MAX_SESSION_DURATION_HOURS} hours"
-            })
+        bot = get_bot()
+        stats = bot.get_bot_stats()
 
-            return jsonify(stats)
+        # Add system stats
+        stats.update({
+            "api_status": "active",
+            "environment": Config.FLASK_ENV,
+            "openai_configured": bool(Config.OPENAI_API_KEY),
+            "twilio_configured": bool(Config.TWILIO_ACCOUNT_SID),
+            "photo_storage": Config.PHOTO_STORAGE_PATH,
+            "max_session_duration": f"{Config.MAX_SESSION_DURATION_HOURS} hours"
+        })
 
-        except Exception as e:
-            logger.error(f"Error getting stats: {e}")
-            return jsonify({"error": "Failed to get statistics"}), 500
+        return jsonify(stats)
 
     @app.route('/test', methods=['POST'])
     def test_verification():
         """Test photo verification (for development)"""
         if Config.FLASK_ENV != 'development':
-            return jsonify({"error": "Test endpoint only available in development"}), 403
+            abort(403, "Test endpoint only available in development")
 
-        try:
-            # Check if file was uploaded
-            if 'photo' not in request.files:
-                return jsonify({"error": "No photo file provided"}), 400
+        # Check if file was uploaded
+        if 'photo' not in request.files:
+            abort(400, "No photo file provided")
 
-            photo = request.files['photo']
-            step = int(request.form.get('step', 1))
+        photo = request.files['photo']
+        step = int(request.form.get('step', 1))
 
-            if photo.filename == '':
-                return jsonify({"error": "No photo file selected"}), 400
+        if photo.filename == '':
+            abort(400, "No photo file selected")
 
-            # Save photo temporarily
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-                photo.save(temp_file.name)
-                temp_path = temp_file.name
+        # Save photo temporarily
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
+            photo.save(temp_file.name)
+            temp_path = temp_file.name
 
+        try:
             # Verify photo
             bot = get_bot()
             result = bot.verifier.verify_step(temp_path, step)
-
+        finally:
             # Clean up
             os.unlink(temp_path)
 
-            return jsonify({
-                "step": result.step,
-                "step_name": result.step_name,
-                "passed": result.passed,
-                "score": result.score,
-                "issues": result.issues,
-                "confidence": result.confidence,
-                "recommendation": result.recommendation
-            })
-
-        except Exception as e:
-            logger.error(f"Error in test verification: {e}")
-            return jsonify({"error": str(e)}), 500
+        return jsonify({
+            "step": result.step,
+            "step_name": result.step_name,
+            "passed": result.passed,
+            "score": result.score,
+            "issues": result.issues,
+            "confidence": result.confidence,
+            "recommendation": result.recommendation
+        })
 
     @app.route('/sessions', methods=['GET'])
     def get_sessions():
         """Get active sessions (admin endpoint)"""
         if Config.FLASK_ENV != 'development':
-            return jsonify({"error": "Sessions endpoint only available in development"}), 403
-
-        try:
-            bot = get_bot()
-            sessions = bot.session_manager.get_active_sessions()
-
-            session_data = []
-            for session in sessions:
-                session_data.append({
-                    "agent_id": session.agent_id,
-                    "phone_number": session.phone_number,
-                    "job_id": session.current_job_id,
-                    "current_step": session.current_step,
-                    "completed_steps": len(session.completed_steps),
-                    "session_start": session.session_start.isoformat(),
-                    "last_activity": session.last_activity.isoformat(),
-                    "status": session.status
-                })
-
-            return jsonify({
-                "active_sessions": len(session_data),
-                "sessions": session_data
-            })
-
-        except Exception as e:
-            logger.error(f"Error getting sessions: {e}")
-            return jsonify({"error": str(e)}), 500
+            abort(403, "Sessions endpoint only available in development")
+
+        bot = get_bot()
+        sessions = bot.session_manager.get_active_sessions()
+
+        # orjson writes the datetimes itself, in the same ISO format
+        return Response(orjson.dumps({
+            "active_sessions": len(sessions),
+            "sessions": [{
+                "agent_id": s.agent_id,
+                "phone_number": s.phone_number,
+                "job_id": s.current_job_id,
+                "current_step": s.current_step,
+                "completed_steps": s.completed_count,
+                "session_start": s.session_start,
+                "last_activity": s.last_activity,
+                "status": s.status
+            } for s in sessions]
+        }), mimetype='application/json')
 
     @app.route('/config', methods=['GET'])
     def get_config():
         """Get configuration info (sanitized)"""
         if Config.FLASK_ENV != 'development':
-            return jsonify({"error": "Config endpoint only available in development"}), 403
-
-        try:
-            config_info = {
-                "environment": Config.FLASK_ENV,
-                "photo_storage": Config.PHOTO_STORAGE_PATH,
-                "max_photo_size_mb": Config.MAX_PHOTO_SIZE_MB,
-                "compression_quality": Config.COMPRESSION_QUALITY,
-                "max_photo_dimension": Config.MAX_PHOTO_DIMENSION,
-                "max_photos_per_hour": Config.MAX_PHOTOS_PER_HOUR,
-                "max_session_duration_hours": Config.MAX_SESSION_DURATION_HOURS,
-                "total_installation_steps": Config.TOTAL_INSTALLATION_STEPS,
-                "passing_score_threshold": Config.PASSING_SCORE_THRESHOLD,
-                "passing_completion_rate": Config.PASSING_COMPLETION_RATE,
-                "openai_configured": bool(Config.OPENAI_API_KEY),
-                "twilio_configured": all([
-                    Config.TWILIO_ACCOUNT_SID,
-                    Config.TWILIO_AUTH_TOKEN,
-                    Config.WHATSAPP_NUMBER
-                ])
-            }
-
-            return jsonify(config_info)
+            abort(403, "Config endpoint only available in development")
+
+        config_info = {
+            "environment": Config.FLASK_ENV,
+            "photo_storage": Config.PHOTO_STORAGE_PATH,
+            "max_photo_size_mb": Config.MAX_PHOTO_SIZE_MB,
+            "compression_quality": Config.COMPRESSION_QUALITY,
+            "max_photo_dimension": Config.MAX_PHOTO_DIMENSION,
+            "max_photos_per_hour": Config.MAX_PHOTOS_PER_HOUR,
+            "max_session_duration_hours": Config.MAX_SESSION_DURATION_HOURS,
+            "total_installation_steps": Config.TOTAL_INSTALLATION_STEPS,
+            "passing_score_threshold": Config.PASSING_SCORE_THRESHOLD,
+            "passing_completion_rate": Config.PASSING_COMPLETION_RATE,
+            "openai_configured": bool(Config.OPENAI_API_KEY),
+            "twilio_configured": all([
+                Config.TWILIO_ACCOUNT_SID,
+                Config.TWILIO_AUTH_TOKEN,
+                Config.WHATSAPP_NUMBER
+            ])
+        }
 
-        except Exception as e:
-            logger.error(f"Error getting config: {e}")
-            return jsonify({"error": str(e)}), 500
+        return jsonify(config_info)
 
     @app.route('/admin/strictness', methods=['GET', 'POST'])
     def admin_strictness():
         """Admin endpoint to view/adjust AI strictness settings"""
         if Config.FLASK_ENV != 'development':
-            return jsonify({"error": "Admin endpoint only available in development"}), 403
+            abort(403, "Admin endpoint only available in development")
         
         if request.method == 'GET':
             # Return current strictness settings
-            return jsonify({
+            return Response(orjson.dumps({
                 "current_settings": {
                     "passing_score_threshold": Config.PASSING_SCORE_THRESHOLD,
                     "passing_completion_rate": Config.PASSING_COMPLETION_RATE,
                     "minimum_passed_steps": 10,  # Currently hardcoded
                     "total_steps": 12
                 },
-                "description": {
-                    "passing_score_threshold": "Minimum score (0-10) for individual photos to pass",
-                    "passing_completion_rate": "Minimum percentage (0-1) of steps that must be completed",
-                    "minimum_passed_steps": "Minimum number of steps that must pass for overall approval"
-                },
-                "recommendations": {
-                    "strict": {"passing_score_threshold": 9, "description": "Very strict - only excellent photos pass"},
-                    "standard": {"passing_score_threshold": 8, "description": "Standard quality - good photos pass"},
-                    "lenient": {"passing_score_threshold": 7, "description": "More lenient - acceptable photos pass"},
-                    "testing": {"passing_score_threshold": 5, "description": "Testing mode - most photos pass"}
-                }
-            })
+                **_STRICTNESS_STATIC
+            }), mimetype='application/json')
         
         elif request.method == 'POST':
-            try:
-                # Update strictness settings
-                data = request.get_json()
-                
-                if 'passing_score_threshold' in data:
-                    new_threshold = float(data['passing_score_threshold'])
-                    if 0 <= new_threshold <= 10:
-                        Config.PASSING_SCORE_THRESHOLD = new_threshold
-                        logger.info(f"Updated passing score threshold to {new_threshold}")
-                    else:
-                        return jsonify({"error": "passing_score_threshold must be between 0 and 10"}), 400
-                
-                if 'passing_completion_rate' in data:
-                    new_rate = float(data['passing_completion_rate'])
-                    if 0 <= new_rate <= 1:
-                        Config.PASSING_COMPLETION_RATE = new_rate
-                        logger.info(f"Updated passing completion rate to {new_rate}")
-                    else:
-                        return jsonify({"error": "passing_completion_rate must be between 0 and 1"}), 400
-                
-                return jsonify({
-                    "success": True,
-                    "updated_settings": {
-                        "passing_score_threshold": Config.PASSING_SCORE_THRESHOLD,
-                        "passing_completion_rate": Config.PASSING_COMPLETION_RATE
-                    },
-                    "message": "Strictness settings updated successfully"
-                })
-                
-            except Exception as e:
-                logger.error(f"Error updating strictness settings: {e}")
-                return jsonify({"error": str(e)}), 500
+            # Update strictness settings
+            data = request.get_json()
+            
+            if 'passing_score_threshold' in data:
+                new_threshold = float(data['passing_score_threshold'])
+                if 0 <= new_threshold <= 10:
+                    Config.PASSING_SCORE_THRESHOLD = new_threshold
+                    logger.info(f"Updated passing score threshold to {new_threshold}")
+                else:
+                    abort(400, "passing_score_threshold must be between 0 and 10")
+            
+            if 'passing_completion_rate' in data:
+                new_rate = float(data['passing_completion_rate'])
+                if 0 <= new_rate <= 1:
+                    Config.PASSING_COMPLETION_RATE = new_rate
+                    logger.info(f"Updated passing completion rate to {new_rate}")
+                else:
+                    abort(400, "passing_completion_rate must be between 0 and 1")
+            
+            return jsonify({
+                "success": True,
+                "updated_settings": {
+                    "passing_score_threshold": Config.PASSING_SCORE_THRESHOLD,
+                    "passing_completion_rate": Config.PASSING_COMPLETION_RATE
+                },
+                "message": "Strictness settings updated successfully"
+            })
 
     # ==================== NEW ENDPOINTS FOR NEON INTEGRATION ====================
 
@@ -268,33 +330,26 @@ def register_routes(app: Flask):
         }
         """
         try:
-            data = request.get_json()
+            req = msgspec.json.decode(request.get_data(), type=SubmitReq)
+        except msgspec.DecodeError as e:
+            abort(400, str(e))
 
-            if not data or 'drop_number' not in data:
-                return jsonify({"error": "drop_number is required"}), 400
+        drop_number = req.drop_number
+        contractor_number = req.contractor_number
+        project_name = req.project_name
 
-            drop_number = data['drop_number']
-            contractor_number = data.get('contractor_number', 'Unknown')
-            project_name = data.get('project_name', 'Velo Test')
+        logger.info("📥 Received installation submission: %s from %s", drop_number, contractor_number)
 
-            logger.info(f"📥 Received installation submission: {drop_number} from {contractor_number}")
+        # Save to database (batched with other submissions arriving together)
+        result = queue_installation(drop_number, contractor_number, project_name)
 
-            # Save to database
-            result = save_installation(drop_number, contractor_number, project_name)
-
-            if result['success']:
-                logger.info(f"✅ Installation {drop_number} saved successfully")
-                return jsonify(result), 200
-            else:
-                logger.error(f"❌ Failed to save installation {drop_number}: {result.get('error')}")
-                return jsonify(result), 500
-
-        except Exception as e:
-            logger.error(f"❌ Error in submit_installation: {str(e)}")
-            return jsonify({
-                "success": False,
-                "error": str(e)
-            }), 500
+        if result['success']:
+            logger.info("✅ Installation %s saved successfully", drop_number)
+            return jsonify(result), 200
+        else:
+            logger.error("❌ Failed to save installation %s: %s", drop_number, result.get('error'))
+            # A timed-out write may still land; a retry then reports "exists"
+            return jsonify(result), 503 if result.get('retryable') else 500
 
     @app.route('/send', methods=['POST'])
     def send_whatsapp():
@@ -308,58 +363,39 @@ def register_routes(app: Flask):
             "message": "Your drop DR12345678 is incomplete..."
         }
         """
-        try:
-            # Verify API key
-            api_key = request.headers.get('X-API-Key')
-            expected_key = os.getenv('BRIDGE_API_KEY')
-
-            if expected_key and api_key != expected_key:
-                logger.warning(f"⚠️ Invalid API key attempt from {request.remote_addr}")
-                return jsonify({"error": "Unauthorized"}), 401
-
-            data = request.get_json()
+        # Verify API key
+        api_key = request.headers.get('X-API-Key')
+        expected_key = os.getenv('BRIDGE_API_KEY')
 
-            if not data or 'to' not in data or 'message' not in data:
-                return jsonify({"error": "Both 'to' and 'message' are required"}), 400
+        if expected_key and api_key != expected_key:
+            logger.warning("⚠️ Invalid API key attempt from %s", request.remote_addr)
+            abort(401, "Unauthorized")
 
-            to_number = data['to']
-            message = data['message']
+        data = request.get_json()
 
-            # Ensure number has whatsapp: prefix for Twilio
-            if not to_number.startswith('whatsapp:'):
-                to_number = f"whatsapp:{to_number}"
+        if not data or 'to' not in data or 'message' not in data:
+            abort(400, "Both 'to' and 'message' are required")
 
-            logger.info(f"📤 Sending WhatsApp message to {to_number}")
+        to_number = data['to']
+        message = data['message']
 
-            # Send via Twilio
-            from twilio.rest import Client
+        # Ensure number has whatsapp: prefix for Twilio
+        if not to_number.startswith('whatsapp:'):
+            to_number = f"whatsapp:{to_number}"
 
-            client = Client(
-                Config.TWILIO_ACCOUNT_SID,
-                Config.TWILIO_AUTH_TOKEN
-            )
-
-            twilio_message = client.messages.create(
-                from_=f"whatsapp:{Config.WHATSAPP_NUMBER}",
-                to=to_number,
-                body=message
-            )
+        logger.info("📤 Sending WhatsApp message to %s", to_number)
 
-            logger.info(f"✅ WhatsApp message sent successfully: SID={twilio_message.sid}")
+        # Send via the shared Twilio client (pooled connections)
+        twilio_message = send_whatsapp_message(to_number, message)
 
-            return jsonify({
-                "success": True,
-                "message_sid": twilio_message.sid,
-                "to": to_number,
-                "status": twilio_message.status
-            }), 200
+        logger.info("✅ WhatsApp message sent successfully: SID=%s", twilio_message.sid)
 
-        except Exception as e:
-            logger.error(f"❌ Failed to send WhatsApp message: {str(e)}")
-            return jsonify({
-                "success": False,
-                "error": str(e)
-            }), 500
+        return jsonify({
+            "success": True,
+            "message_sid": twilio_message.sid,
+            "to": to_number,
+            "status": twilio_message.status
+        }), 200
 
     @app.route('/api/resubmit', methods=['POST'])
     def handle_resubmit():
@@ -373,31 +409,23 @@ def register_routes(app: Flask):
         }
         """
         try:
-            data = request.get_json()
-
-            if not data or 'drop_number' not in data:
-                return jsonify({"error": "drop_number is required"}), 400
-
-            drop_number = data['drop_number']
+            req = msgspec.json.decode(request.get_data(), type=ResubmitReq)
+        except msgspec.DecodeError as e:
+            abort(400, str(e))
 
-            logger.info(f"🔄 Received resubmission for: {drop_number}")
+        drop_number = req.drop_number
 
-            # Update database
-            result = mark_resubmitted(drop_number)
+        logger.info("🔄 Received resubmission for: %s", drop_number)
 
-            if result['success']:
-                logger.info(f"✅ Drop {drop_number} marked as resubmitted")
-                return jsonify(result), 200
-            else:
-                logger.error(f"❌ Failed to mark {drop_number} as resubmitted: {result.get('error')}")
-                return jsonify(result), 500
+        # Update database
+        result = mark_resubmitted(drop_number)
 
-        except Exception as e:
-            logger.error(f"❌ Error in handle_resubmit: {str(e)}")
-            return jsonify({
-                "success": False,
-                "error": str(e)
-            }), 500
+        if result['success']:
+            logger.info("✅ Drop %s marked as resubmitted", drop_number)
+            return jsonify(result), 200
+        else:
+            logger.error("❌ Failed to mark %s as resubmitted: %s", drop_number, result.get('error'))
+            return jsonify(result), 500
 
     @app.route('/db/test', methods=['GET'])
     def test_database():
@@ -0,0 +1,38 @@
+"""
+WSGI entry point for production servers
+
+gevent must patch the standard library before anything else imports socket,
+ssl or threading, so that requests, twilio and the OpenAI client yield to
+other greenlets while waiting on the network instead of blocking the worker.
+psycopg2 talks to Neon from C, out of gevent's reach, so psycogreen installs
+a wait callback that makes its queries yield the same way.
+
+Run with:
+    gunicorn -k gevent -w 1 --worker-connections 1000 --keep-alive 20 --timeout 30 src.api.wsgi:app
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+from psycogreen.gevent import patch_psycopg  # noqa: E402
+
+patch_psycopg()
+
+import logging  # noqa: E402
+
+from .app import app  # noqa: E402
+from .routes import get_bot  # noqa: E402
+
+__all__ = ['app']  # re-exported for gunicorn
+
+logger = logging.getLogger(__name__)
+
+# gunicorn imports this module in the worker (no --preload), so the bot's
+# session writer and verification threads start after the fork. Building it
+# here means the first webhook does not pay for it; importing the app
+# elsewhere (tests, scripts) stays side-effect free.
+try:
+    get_bot()
+except Exception as e:
+    logger.warning("Bot initialization deferred to first request: %s", e)
@@ -1,17 +1,265 @@
 import os
+import re
+import sys
+import time
 import logging
 from typing import Dict, Optional
 from dataclasses import dataclass
 from datetime import datetime
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from itertools import islice
 
 from ..config import Config
-from ..storage.sessions import SessionManager
+from ..storage.sessions import SessionManager, normalize_phone_number
 from ..verifier import FiberInstallationVerifier, VerificationResult
-from ..prompts import STEP_NAMES, STEP_REQUIREMENTS
+from ..prompts import STEP_NAMES, STEP_NAMES_TUPLE, STEP_REQUIREMENTS_TUPLE
 from .handlers import MessageHandler
 
 logger = logging.getLogger(__name__)
 
+# Fixed replies, built once at import
+_GREETING_MSG = (
+    "👋 *Hello! Welcome to Fiber Installation Bot*\n\n"
+    "I'm here to help you verify fiber installation photos step by step.\n\n"
+    "*What would you like to do?*\n"
+    "• Send `START` to begin a new installation\n"
+    "• Send `STATUS` to check your progress\n"
+    "• Send `HELP` for more information\n\n"
+    "Ready when you are! 🚀"
+)
+
+_HELP_MSG = (
+    "🔧 *Fiber Installation Bot Help*\n\n"
+    "*Available Commands:*\n"
+    "• `START` or `NEW` - Begin new installation\n"
+    "• `STATUS` - Check current progress\n"
+    "• `LIST` - Show all active installations\n"
+    "• `HELP` - Show this help message\n"
+    "• `RESET` - Start over with new installation\n\n"
+    "*Admin Commands:*\n"
+    "• `SKIP` - Skip current step (testing)\n"
+    "• `STRICTNESS` - View/adjust AI evaluation strictness\n\n"
+    "*How to Use:*\n"
+    "1. Send 'START' to begin installation\n"
+    "2. Follow step-by-step photo instructions\n"
+    "3. Send one photo at a time\n"
+    "4. Wait for AI feedback before continuing\n"
+    "5. Complete all 12 steps\n\n"
+    "*Tips:*\n"
+    "📸 Take clear, well-lit photos\n"
+    "🎯 Follow specific requirements for each step\n"
+    "⏱️ Wait 30 seconds for AI analysis\n"
+    "🔄 Retake photos if feedback suggests improvements\n\n"
+    "❓ Need help? Contact your supervisor"
+)
+
+_ERROR_MSG = (
+    "❌ *System Error*\n\n"
+    "We encountered an error processing your request. "
+    "Please try again in a moment.\n\n"
+    "If problems persist, contact your supervisor."
+)
+
+# Commands whose reply never varies, pre-encoded for process_message_bytes
+_STATIC_REPLIES_B = {
+    'HI': _GREETING_MSG.encode('utf-8'),
+    'HELLO': _GREETING_MSG.encode('utf-8'),
+    'HEY': _GREETING_MSG.encode('utf-8'),
+    'HOLA': _GREETING_MSG.encode('utf-8'),
+    'HELP': _HELP_MSG.encode('utf-8'),
+}
+_MAX_STATIC_CMD_LEN = max(map(len, _STATIC_REPLIES_B))
+
+_COMPLETION_TMPL = (
+    "🎉 *Installation Already Completed!*\n\n"
+    "📋 Job ID: {job_id}\n"
+    "✅ All 12 steps successfully verified\n"
+    "🚀 Ready for service activation\n\n"
+    "Type 'NEW' to start another installation."
+)
+
+_STRICTNESS_MENU_TMPL = (
+    "🔧 *AI Strictness Settings*\n\n"
+    "📊 **Current Settings:**\n"
+    "• Score Threshold: {threshold}/10\n"
+    "• Completion Rate: {rate:.0f}%\n\n"
+    "🎯 **Preset Modes:**\n"
+    "• `STRICTNESS STRICT` - Threshold 9 (very strict)\n"
+    "• `STRICTNESS STANDARD` - Threshold 8 (standard)\n"
+    "• `STRICTNESS LENIENT` - Threshold 7 (more lenient)\n"
+    "• `STRICTNESS TESTING` - Threshold 5 (testing mode)\n\n"
+    "📝 **Custom:** `STRICTNESS SET 7.5`\n\n"
+    "💡 *Higher threshold = stricter evaluation*"
+)
+
+# Longest body that can be a command or DR number (e.g. "STRICTNESS SET 7.5")
+_MAX_COMMAND_LEN = 20
+
+# Longest message body worth interning (covers every command keyword)
+_MAX_INTERN_LEN = 16
+
+# Whole-number progress percentage, indexed by completed step count (0..12)
+_PROGRESS_PCT = tuple(round(i * 100 / 12) for i in range(13))
+
+# Seconds a get_bot_stats result is reused; dashboards poll /stats and each
+# fresh result scans every session
+_STATS_TTL = 1.0
+
+# Photo submission acknowledgements (the verdict follows asynchronously)
+_ANALYZING_TMPL = (
+    "📸 *Photo received for Step {step}*\n\n"
+    "🔍 Analyzing... you'll get the result in a moment."
+)
+_STILL_ANALYZING_MSG = (
+    "⏳ Still analyzing your previous photo.\n\n"
+    "Please wait for the result before sending the next one."
+)
+_STALE_RESULT_TMPL = (
+    "ℹ️ Your Step {step} photo finished analyzing after you switched or reset "
+    "the installation, so it was not recorded."
+)
+
+# Verification replies; filled in by _format_verification_response
+_PASS_TMPL = (
+    "✅ *Step {step}: {step_name} - PASSED*\n\n"
+    "📊 *Score: {score:.1f}/10* (Threshold: {threshold}/10)\n\n"
+    "{quality}"
+    "\n📊 *Progress: {done}/12 steps completed ({percent}%)*"
+    "\n\n{next_block}"
+)
+_FAIL_TMPL = (
+    "❌ *Step {step}: {step_name} - NEEDS RETAKE*\n\n"
+    "📊 *Score: {score:.1f}/10* (Need: {threshold}/10)\n\n"
+    "{fixes}"
+    "\n💡 *Try this:*\n{recommendation}\n\n"
+    "📸 *Take the photo again and send it.*\n"
+    "📊 *Progress: {done}/12 steps completed*"
+)
+# Indexed by (score >= 7) + (score >= 9)
+_QUALITY_NOTES = (
+    "",
+    "✨ *Good job!* Photo meets quality standards.\n",
+    "🌟 *Excellent work!* Photo quality is outstanding.\n",
+)
+_ALL_STEPS_DONE = "🎉 *All steps completed! Installation verified and ready for activation.*"
+
+# Technical terms -> plain wording for field agents (keys lowercase)
+_SIMPLIFY_MAP = {
+    'ont': 'white box',
+    'fiber cable': 'cable',
+    'pigtail screw': 'cable entry point',
+    'duct entry': 'cable hole',
+    'weather-proofing': 'weather protection',
+    'penetration': 'hole',
+    'installation area': 'work area',
+    'equipment': 'devices',
+    'visible and stable': 'clear and steady',
+    'identifiable': 'clear',
+    'insufficient': 'not enough',
+    'not adequately documented': 'not clear enough',
+    'strain relief': 'cable support',
+}
+# Whole words only (a trailing plural 's' is kept), so "front" stays "front"
+_SIMPLIFY_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(k) for k in sorted(_SIMPLIFY_MAP, key=len, reverse=True)) + r')(?=s?\b)'
+)
+
+# Recommendation keywords -> actionable advice, in priority order
+_REC_RE = re.compile(
+    r'(?P<wider>wider|step back)|(?P<closer>closer|close-up)|(?P<angle>angle)'
+    r'|(?P<lighting>light)|(?P<clear>clear)|(?P<visible>visible)'
+)
+_REC_PRIORITY = ('wider', 'closer', 'angle', 'lighting', 'clear', 'visible')
+_REC_ACTIONS = {
+    'wider': "Step further back to fit more in the photo",
+    'closer': "Get closer to show more detail",
+    'angle': "Try a different angle - move to the side or front",
+    'lighting': "Take the photo in better light or use your phone's flash",
+    'clear': "Make sure the camera is focused and the image is sharp",
+    'visible': "Make sure you can clearly see what's needed in the photo",
+}
+
+# DR followed by 4-10 digits (flexible for different formats); \Z, unlike $,
+# does not accept a trailing newline
+_DR_RE = re.compile(r'DR\d{4,10}\Z')
+
+# Location keywords in a media URL (WhatsApp location shares / map links)
+_LOC_RE = re.compile(r'location|maps|coordinates|lat=|lng=|geo:', re.IGNORECASE)
+
+# "Next step" prompt block for steps 1..12, indexed by step - 1
+NEXT_STEP_BLOCKS = tuple(
+    f"📷 *Next Step: {STEP_NAMES_TUPLE[i]}*\n{STEP_REQUIREMENTS_TUPLE[i]}"
+    for i in range(1, 13)
+)
+
+# DR number selection replies; filled in by _handle_dr_input
+_INVALID_DR_TMPL = (
+    "❌ *Invalid DR Number Format*\n\n"
+    "You entered: {dr_input}\n\n"
+    "Please use the correct format:\n"
+    "• DR followed by 4-10 digits\n"
+    "• Example: DR0123456\n\n"
+    "Please try again:"
+)
+_DR_LIMIT_MSG = (
+    "❌ *Installation Limit Reached*\n\n"
+    "You can only manage 10 installations at once.\n"
+    "Please complete or cancel existing installations first.\n\n"
+    "Type 'LIST' to see your active installations."
+)
+_SWITCHED_LOCATION_TMPL = (
+    "🔄 *Switched to DR {dr_input}*\n\n"
+    "📋 Job ID: {job_id}\n"
+    "📍 *Location Verification Required*\n"
+    "Please share your current location using WhatsApp's location sharing feature."
+)
+_SWITCHED_STEP_TMPL = (
+    "🔄 *Switched to DR {dr_input}*\n\n"
+    "📋 Job ID: {job_id}\n"
+    "📈 Progress: {done}/12 steps ({percent}%)\n\n"
+    "📷 *Current Step: {step_name}*\n"
+    "{requirements}\n\n"
+    "📍 Location: {location}"
+)
+_DR_COMPLETED_TMPL = "🎉 *Installation DR {dr_input} is completed!*"
+_LOC_PROMPT_TMPL = (
+    "✅ *New Installation Created*\n\n"
+    "📄 DR Number: {dr_input}\n"
+    "📋 Job ID: {job_id}\n\n"
+    "📍 *Location Verification Required*\n"
+    "Please share your current location using WhatsApp's location sharing feature:\n\n"
+    "1. Tap the attachment (📎) icon\n"
+    "2. Select 'Location'\n"
+    "3. Choose 'Share Live Location' or 'Send Your Current Location'\n\n"
+    "🎯 This ensures you're at the correct installation site."
+)
+
+# Reply to a verified location share; only the DR number varies
+_STEP1_MSG_TEMPLATE = (
+    "✅ *Location Verified*\n\n"
+    "📍 Location recorded successfully\n"
+    "📄 DR Number: {dr_number}\n\n"
+    "📷 *Step 1: Property Frontage*\n"
+    f"{STEP_REQUIREMENTS_TUPLE[1]}\n\n"
+    "Please send a clear photo showing the house/building with street number visible."
+)
+
+# (epoch minute, formatted local time) for the minute-resolution "Started" stamp
+_minute_stamp = (-1, '')
+
+
+def _now_minute() -> str:
+    """Current local time as 'YYYY-MM-DD HH:MM', formatted at most once per minute"""
+    global _minute_stamp
+    now = time.time()
+    minute = int(now // 60)
+    if _minute_stamp[0] != minute:
+        _minute_stamp = (minute, datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M'))
+    return _minute_stamp[1]
+
+
 class FiberInstallationBot:
     """WhatsApp bot for fiber installation photo verification"""
 
@@ -21,9 +269,39 @@ class FiberInstallationBot:
         self.verifier = FiberInstallationVerifier()
         self.message_handler = MessageHandler()
 
+        # Photo verification (OpenAI vision, seconds per call) runs off the webhook
+        # thread; the result is pushed to the agent as a follow-up message
+        self._verify_pool = ThreadPoolExecutor(
+            max_workers=Config.VERIFY_WORKERS, thread_name_prefix='verify'
+        )
+        self._pending = set()  # phone numbers with a verification in flight
+        self._pending_lock = Lock()
+
+        # (monotonic expiry, stats dict) for get_bot_stats
+        self._stats_cache = (float('-inf'), None)
+
+        # Exact-match text commands -> handler(from_number); keys are interned
+        # so lookups of interned message bodies hit on identity
+        self._commands = {sys.intern(k): v for k, v in {
+            'START': self._handle_start_command,
+            'NEW': self._handle_start_command,
+            'HI': self._handle_greeting_command,
+            'HELLO': self._handle_greeting_command,
+            'HEY': self._handle_greeting_command,
+            'HOLA': self._handle_greeting_command,
+            'STATUS': self._handle_status_command,
+            'HELP': self._handle_help_command,
+            'RESET': self._handle_reset_command,
+            'LIST': self._handle_list_command,
+            'SKIP': partial(self._handle_skip_command, skip_type='SKIP'),
+            'SKIP LOCATION': partial(self._handle_skip_command, skip_type='SKIP LOCATION'),
+            'SKIP STEP': partial(self._handle_skip_command, skip_type='SKIP STEP'),
+        }.items()}
+
     def process_message(self, from_number: str, message_body: str,
                        media_url: Optional[str] = None,
-                       media_id: Optional[str] = None) -> str:
+                       media_id: Optional[str] = None,
+                       location: Optional[Dict] = None) -> str:
         """
         Process incoming WhatsApp message
 
@@ -32,6 +310,8 @@ class FiberInstallationBot:
             message_body: Message text content
             media_url: URL of media (photo) if provided
             media_id: Media ID for downloading
+            location: Shared location fields (latitude, longitude, ...) if the
+                webhook already identified the message as a location share
 
         Returns:
             Response message to send back
@@ -39,32 +319,30 @@ class FiberInstallationBot:
         try:
             # Normalize phone number
             from_number = self._normalize_phone_number(from_number)
-            message_body = message_body.strip().upper()
+            message_body = message_body.strip()
+            # Commands and DR numbers are short and start with a letter; anything
+            # else is free text and skips the uppercase copy
+            if 0 < len(message_body) <= _MAX_COMMAND_LEN and message_body[0].isalpha():
+                message_body = message_body.upper()
+                if len(message_body) <= _MAX_INTERN_LEN:
+                    # Short bodies are almost always commands; free text is not interned
+                    message_body = sys.intern(message_body)
 
-            logger.info(f"Processing message from {from_number}: {message_body[:50]}...")
+            logger.info("Processing message from %s: %.50s...", from_number, message_body)
 
             # Handle different message types
-            if media_url:
-                # Check if it's a location share or photo
+            if location:
+                return self._handle_location_message(from_number, media_url, location)
+            elif media_url:
+                # Fallback heuristic for location links sent as media
                 if self._is_location_message(media_url):
                     return self._handle_location_message(from_number, media_url)
                 else:
                     return self._handle_photo_message(from_number, media_url, media_id)
-            elif message_body in ['START', 'NEW', 'HI', 'HELLO', 'HEY', 'HOLA']:
-                if message_body in ['START', 'NEW']:
-                    return self._handle_start_command(from_number)
-                else:
-                    return self._handle_greeting_command(from_number)
-            elif message_body == 'STATUS':
-                return self._handle_status_command(from_number)
-            elif message_body == 'HELP':
-                return self._handle_help_command(from_number)
-            elif message_body == 'RESET':
-                return self._handle_reset_command(from_number)
-            elif message_body in ['SKIP', 'SKIP LOCATION', 'SKIP STEP']:
-                return self._handle_skip_command(from_number, message_body)
-            elif message_body == 'LIST':
-                return self._handle_list_command(from_number)
+
+            handler = self._commands.get(message_body)
+            if handler is not None:
+                return handler(from_number)
             elif message_body.startswith('STRICTNESS'):
                 return self._handle_strictness_command(from_number, message_body)
             else:
@@ -72,9 +350,31 @@ class FiberInstallationBot:
                 return self._handle_text_input(from_number, message_body)
 
         except Exception as e:
-            logger.error(f"Error processing message from {from_number}: {e}")
+            logger.error("Error processing message from %s: %s", from_number, e)
             return self._generate_error_response()
 
+    def process_message_bytes(self, from_number: str, message_body: str,
+                              media_url: Optional[str] = None,
+                              media_id: Optional[str] = None,
+                              location: Optional[Dict] = None) -> bytes:
+        """
+        Same as process_message, but returns the reply UTF-8 encoded
+
+        Fixed replies (greetings, HELP) come straight from pre-encoded
+        constants; everything else goes through process_message.
+        """
+        if not media_url and not location:
+            body = message_body.strip()
+            if 0 < len(body) <= _MAX_STATIC_CMD_LEN:
+                static = _STATIC_REPLIES_B.get(body.upper())
+                if static is not None:
+                    logger.info("Processing message from %s: %.50s...", from_number, body)
+                    return static
+
+        return self.process_message(
+            from_number, message_body, media_url=media_url, media_id=media_id, location=location
+        ).encode('utf-8')
+
     def _handle_photo_message(self, from_number: str, media_url: str, media_id: str) -> str:
         """Handle incoming photo submission"""
         session = self.session_manager.get_session(from_number)
@@ -93,55 +393,82 @@ class FiberInstallationBot:
         if session.current_step > 12:
             return self._generate_completion_message(session)
 
-        try:
-            # Download photo
-            photo_path = self.message_handler.download_photo(media_url, session.current_job_id)
-            if not photo_path:
-                return "❌ Error downloading your photo. Please try sending it again."
+        step = session.current_step
+        with self._pending_lock:
+            if from_number in self._pending:
+                return _STILL_ANALYZING_MSG
+            self._pending.add(from_number)
 
-            # Verify photo
-            result = self.verifier.verify_step(photo_path, session.current_step)
+        try:
+            # Download and verify in the background; the result arrives as a follow-up message
+            self._verify_pool.submit(
+                self._verify_and_reply, from_number, media_url, step, session.current_job_id
+            )
+            return _ANALYZING_TMPL.format(step=step)
 
-            # Generate response
-            response = self._format_verification_response(result, session)
+        except Exception as e:
+            self._release_pending(from_number)
+            logger.error("Error handling photo for %s: %s", from_number, e)
+            return "❌ Error processing your photo. Please try again."
 
-            # Update session if passed
-            if result.passed:
-                self.session_manager.complete_step(from_number, session.current_step, photo_path)
-                logger.info(f"Step {session.current_step} passed for {from_number}")
-            else:
-                logger.info(f"Step {session.current_step} failed for {from_number}: {result.issues}")
+    def _verify_and_reply(self, from_number: str, media_url: str, step: int, job_id: str):
+        """Pool job: download and verify a photo, record a pass and send the result to the agent"""
+        try:
+            response = self._download_and_verify(from_number, media_url, step, job_id)
 
-            return response
+        except Exception as e:
+            logger.error("Error verifying photo for %s: %s", from_number, e)
+            response = "❌ Error processing your photo. Please try again."
 
+        try:
+            self.message_handler.send_message(from_number, response)
         except Exception as e:
-            logger.error(f"Error handling photo for {from_number}: {e}")
-            return "❌ Error processing your photo. Please try again."
+            logger.error("Error sending verification result to %s: %s", from_number, e)
+        finally:
+            self._release_pending(from_number)
+
+    def _download_and_verify(self, from_number: str, media_url: str, step: int, job_id: str) -> str:
+        """Download and verify one photo; returns the reply for the agent"""
+        # Download photo
+        photo_path = self.message_handler.download_photo(media_url, job_id)
+        if not photo_path:
+            return "❌ Error downloading your photo. Please try sending it again."
+
+        result = self.verifier.verify_step(photo_path, step)
+
+        session = self.session_manager.get_session(from_number)
+        if not session or session.current_job_id != job_id or session.current_step != step:
+            # Agent switched installation or reset while we were verifying
+            logger.info("Discarding stale step %s result for %s (%s)", step, from_number, job_id)
+            return _STALE_RESULT_TMPL.format(step=step)
+
+        # Generate response
+        response = self._format_verification_response(result, session)
+
+        # Update session if passed
+        if result.passed:
+            self.session_manager.complete_step(from_number, step, photo_path)
+            logger.info("Step %s passed for %s", step, from_number)
+        else:
+            logger.info("Step %s failed for %s: %s", step, from_number, result.issues)
+
+        return response
+
+    def _release_pending(self, from_number: str):
+        """Allow the next photo from this number to be verified"""
+        with self._pending_lock:
+            self._pending.discard(from_number)
 
     def _handle_greeting_command(self, from_number: str) -> str:
         """Handle greeting commands with friendly welcome"""
-        greeting_msg = (
-            "👋 *Hello! Welcome to Fiber Installation Bot*\n\n"
-            "I'm here to help you verify fiber installation photos step by step.\n\n"
-            "*What would you like to do?*\n"
-            "• Send `START` to begin a new installation\n"
-            "• Send `STATUS` to check your progress\n"
-            "• Send `HELP` for more information\n\n"
-            "Ready when you are! 🚀"
-        )
-        return greeting_msg
+        return _GREETING_MSG
 
     def _handle_reset_command(self, from_number: str) -> str:
         """Handle RESET command to start new installation"""
-        # Reset any existing session to start fresh
-        existing_session = self.session_manager.get_session(from_number)
-        if existing_session:
-            self.session_manager.reset_session(from_number)
-        else:
-            # Create new session
+        # Reset any existing session to start fresh, otherwise create one
+        if self.session_manager.reset_session(from_number) is None:
             self.session_manager.get_or_create_session(from_number)
-        
-        session = self.session_manager.get_session(from_number)
+
         return self._handle_start_command(from_number)
     
     def _handle_skip_command(self, from_number: str, skip_type: str) -> str:
@@ -151,46 +478,42 @@ class FiberInstallationBot:
         if not session:
             return "❌ No active installation found. Type 'START' to begin."
         
-        logger.info(f"Admin SKIP command used by {from_number}: {skip_type}")
+        logger.info("Admin SKIP command used by %s: %s", from_number, skip_type)
         
         if session.current_step == -1:  # Awaiting location
             # Skip location verification, move to Step 1
             self.session_manager.update_session(
                 from_number,
                 location_verified=True,
-                location_data={"skipped": True, "timestamp": datetime.now().isoformat()},
+                location_data={"skipped": True, "timestamp_ns": time.time_ns()},
                 current_step=1
             )
             
-            step1_name = STEP_NAMES.get(1, "Step 1")
             return (
                 f"⚠️ *Location Verification SKIPPED* (Admin)\n\n"
                 f"📋 Job ID: {session.current_job_id}\n"
                 f"📄 DR Number: {session.dr_number}\n"
                 f"📍 Location: ⚠️ Skipped for testing\n\n"
-                f"📷 *Step 1: {step1_name}*\n"
-                f"{STEP_REQUIREMENTS[1]}"
+                f"📷 *Step 1: {STEP_NAMES_TUPLE[1]}*\n"
+                f"{STEP_REQUIREMENTS_TUPLE[1]}"
             )
         
         elif 1 <= session.current_step <= 12:  # Photo steps
             # Store current step info BEFORE completing
             current_step_number = session.current_step
-            step_name = STEP_NAMES.get(current_step_number, f"Step {current_step_number}")
+            step_name = STEP_NAMES_TUPLE[current_step_number]
             
             # Mark step as completed with skip indicator
-            self.session_manager.complete_step(from_number, current_step_number, "SKIPPED_FOR_TESTING")
-            
-            # Get updated session after completion
-            updated_session = self.session_manager.get_session(from_number)
+            updated_session = self.session_manager.complete_step(
+                from_number, current_step_number, "SKIPPED_FOR_TESTING"
+            )
             
             next_step = updated_session.current_step
             if next_step <= 12:
-                next_name = STEP_NAMES.get(next_step, f"Step {next_step}")
                 return (
                     f"⚠️ *Step {current_step_number}: {step_name} - SKIPPED* (Admin)\n\n"
-                    f"📊 Progress: {len(updated_session.completed_steps)}/12 steps\n\n"
-                    f"📷 *Next Step: {next_name}*\n"
-                    f"{STEP_REQUIREMENTS.get(next_step, 'Please send photo for this step.')}\n\n"
+                    f"📊 Progress: {updated_session.completed_count}/12 steps\n\n"
+                    f"{NEXT_STEP_BLOCKS[next_step - 1]}\n\n"
                     f"⚠️ Note: Step was skipped for testing purposes"
                 )
             else:
@@ -221,19 +544,18 @@ class FiberInstallationBot:
             f"🔧 *New Fiber Installation Started*\n\n"
             f"📋 Job ID: {session.current_job_id}\n"
             f"👷 Agent: {session.agent_id}\n"
-            f"⏰ Started: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
+            f"⏰ Started: {_now_minute()}\n\n"
             f"📄 *Please provide the DR Number*\n"
             f"Send the DR number for this installation (e.g., DR0123456)\n\n"
             f"💡 *Format*: DR followed by numbers (e.g., DR0123456)"
         )
 
-        logger.info(f"Started new installation for {from_number}: {session.current_job_id}")
+        logger.info("Started new installation for %s: %s", from_number, session.current_job_id)
         return welcome_msg
     
     def _handle_list_command(self, from_number: str) -> str:
         """Handle LIST command to show all active installations"""
         try:
-            session = self.session_manager.get_session(from_number)
             installations = self.session_manager.get_installation_list(from_number)
             
             if not installations:
@@ -270,30 +592,19 @@ class FiberInstallationBot:
             return "\n".join(response_lines)
             
         except Exception as e:
-            logger.error(f"Error in list command: {str(e)}")
+            logger.error("Error in list command: %s", e)
             return "Error retrieving installation list."
     
     def _handle_strictness_command(self, from_number: str, message: str) -> str:
         """Handle admin strictness adjustment commands"""
-        from ..config import Config
-        
-        logger.info(f"Admin STRICTNESS command used by {from_number}: {message}")
+        logger.info("Admin STRICTNESS command used by %s: %s", from_number, message)
         
         parts = message.split()
         
         if len(parts) == 1:  # Just 'STRICTNESS' - show current settings
-            return (
-                f"🔧 *AI Strictness Settings*\n\n"
-                f"📊 **Current Settings:**\n"
-                f"• Score Threshold: {Config.PASSING_SCORE_THRESHOLD}/10\n"
-                f"• Completion Rate: {Config.PASSING_COMPLETION_RATE*100:.0f}%\n\n"
-                f"🎯 **Preset Modes:**\n"
-                f"• `STRICTNESS STRICT` - Threshold 9 (very strict)\n"
-                f"• `STRICTNESS STANDARD` - Threshold 8 (standard)\n"
-                f"• `STRICTNESS LENIENT` - Threshold 7 (more lenient)\n"
-                f"• `STRICTNESS TESTING` - Threshold 5 (testing mode)\n\n"
-                f"📝 **Custom:** `STRICTNESS SET 7.5`\n\n"
-                f"💡 *Higher threshold = stricter evaluation*"
+            return _STRICTNESS_MENU_TMPL.format(
+                threshold=Config.PASSING_SCORE_THRESHOLD,
+                rate=Config.PASSING_COMPLETION_RATE * 100
             )
         
         elif len(parts) >= 2:
@@ -342,8 +653,8 @@ class FiberInstallationBot:
         if not session:
             return "❌ No active installation found. Type 'START' to begin."
 
-        completed_count = len(session.completed_steps)
-        progress_percent = (completed_count / 12) * 100
+        completed_count = session.completed_count
+        progress_percent = _PROGRESS_PCT[min(completed_count, 12)]
         
         # Build status based on current step
         if session.current_step == 0:
@@ -378,50 +689,27 @@ class FiberInstallationBot:
                 f"📋 Job ID: {session.current_job_id}\n"
                 f"📄 DR Number: {session.dr_number or 'Not provided'}\n"
                 f"📍 Location: {'✅ Verified' if session.location_verified else '❌ Not verified'}\n"
-                f"📈 Progress: {completed_count}/12 steps ({progress_percent:.0f}%)\n"
+                f"📈 Progress: {completed_count}/12 steps ({progress_percent}%)\n"
                 f"🎯 Current Step: {session.current_step if session.current_step <= 12 else 'Completed'}\n\n"
             )
 
-            if session.completed_steps:
-                status_msg += "✅ *Completed Steps:*\n"
-                for step_num in sorted(session.completed_steps.keys()):
-                    step_name = STEP_NAMES.get(step_num, f"Step {step_num}")
-                    status_msg += f"• {step_name}\n"
+            completed = session.completed_mask
+            if completed:
+                # Steps are 1..12, so walking the bits in order beats sorting
+                status_msg += "✅ *Completed Steps:*\n" + "".join(
+                    f"• {STEP_NAMES_TUPLE[step_num]}\n"
+                    for step_num in range(1, 13) if completed >> step_num & 1
+                )
 
-            if session.current_step <= 12:
-                next_step_name = STEP_NAMES.get(session.current_step, f"Step {session.current_step}")
-                status_msg += f"\n📷 *Next: {next_step_name}*\n"
-                status_msg += STEP_REQUIREMENTS.get(session.current_step, "Please send photo for this step.")
+            if 1 <= session.current_step <= 12:
+                status_msg += f"\n📷 *Next: {STEP_NAMES_TUPLE[session.current_step]}*\n"
+                status_msg += STEP_REQUIREMENTS_TUPLE[session.current_step]
 
         return status_msg
 
     def _handle_help_command(self, from_number: str) -> str:
         """Handle HELP command"""
-        help_msg = (
-            "🔧 *Fiber Installation Bot Help*\n\n"
-            "*Available Commands:*\n"
-            "• `START` or `NEW` - Begin new installation\n"
-            "• `STATUS` - Check current progress\n"
-            "• `LIST` - Show all active installations\n"
-            "• `HELP` - Show this help message\n"
-            "• `RESET` - Start over with new installation\n\n"
-            "*Admin Commands:*\n"
-            "• `SKIP` - Skip current step (testing)\n"
-            "• `STRICTNESS` - View/adjust AI evaluation strictness\n\n"
-            "*How to Use:*\n"
-            "1. Send 'START' to begin installation\n"
-            "2. Follow step-by-step photo instructions\n"
-            "3. Send one photo at a time\n"
-            "4. Wait for AI feedback before continuing\n"
-            "5. Complete all 12 steps\n\n"
-            "*Tips:*\n"
-            "📸 Take clear, well-lit photos\n"
-            "🎯 Follow specific requirements for each step\n"
-            "⏱️ Wait 30 seconds for AI analysis\n"
-            "🔄 Retake photos if feedback suggests improvements\n\n"
-            "❓ Need help? Contact your supervisor"
-        )
-        return help_msg
+        return _HELP_MSG
 
 
     def _handle_unknown_command(self, from_number: str, message: str) -> str:
@@ -435,176 +723,101 @@ class FiberInstallationBot:
     def _format_verification_response(self, result: VerificationResult, session) -> str:
         """Format verification result into user-friendly WhatsApp message"""
 
-        # Import Config for threshold info
-        from ..config import Config
-        
-        if result.passed:
-            # Success message
-            emoji = "✅"
-            status = "PASSED"
-            response = f"{emoji} *Step {result.step}: {result.step_name} - {status}*\n\n"
-            
-            # Add score information
-            response += f"📊 *Score: {result.score:.1f}/10* (Threshold: {Config.PASSING_SCORE_THRESHOLD}/10)\n\n"
-
-            # Add positive feedback
-            if result.score >= 9:
-                response += "🌟 *Excellent work!* Photo quality is outstanding.\n"
-            elif result.score >= 7:
-                response += "✨ *Good job!* Photo meets quality standards.\n"
+        # Snapshot once; STRICTNESS can change it concurrently
+        threshold = Config.PASSING_SCORE_THRESHOLD
 
-            # Progress update
-            completed_count = len(session.completed_steps) + 1  # Include current step
-            progress_percent = (completed_count / 12) * 100
-            response += f"\n📊 *Progress: {completed_count}/12 steps completed ({progress_percent:.0f}%)*"
-
-            # Next step guidance
+        if result.passed:
+            completed_count = session.completed_count + 1  # Include current step
             next_step = result.step + 1
-            if next_step <= 12:
-                next_name = STEP_NAMES.get(next_step, f"Step {next_step}")
-                response += f"\n\n📷 *Next Step: {next_name}*\n"
-                response += STEP_REQUIREMENTS.get(next_step, "Please send photo for this step.")
-            else:
-                response += "\n\n🎉 *All steps completed! Installation verified and ready for activation.*"
-
-        else:
-            # Failure message - SIMPLE & CLEAR for field agents
-            emoji = "❌"
-            status = "NEEDS RETAKE"
-            response = f"{emoji} *Step {result.step}: {result.step_name} - {status}*\n\n"
-            
-            # Add score information to show why it failed
-            response += f"📊 *Score: {result.score:.1f}/10* (Need: {Config.PASSING_SCORE_THRESHOLD}/10)\n\n"
-
-            # Simplified issues - keep only the most important ones
-            main_issues = result.issues[:3]  # Only top 3 issues
-            if main_issues:
-                response += "*What to fix:*\n"
-                for issue in main_issues:
-                    # Simplify technical language
-                    simple_issue = self._simplify_issue_text(issue)
-                    response += f"• {simple_issue}\n"
-            
-            # Simple, actionable recommendation
-            simple_recommendation = self._simplify_recommendation(result.recommendation)
-            response += f"\n💡 *Try this:*\n{simple_recommendation}\n\n"
+            return _PASS_TMPL.format(
+                step=result.step,
+                step_name=result.step_name,
+                score=result.score,
+                threshold=threshold,
+                quality=_QUALITY_NOTES[(result.score >= 7) + (result.score >= 9)],
+                done=completed_count,
+                percent=_PROGRESS_PCT[min(completed_count, 12)],
+                next_block=NEXT_STEP_BLOCKS[next_step - 1] if next_step <= 12 else _ALL_STEPS_DONE,
+            )
 
-            response += "📸 *Take the photo again and send it.*\n"
-            response += f"📊 *Progress: {len(session.completed_steps)}/12 steps completed*"
+        # Failure message - SIMPLE & CLEAR for field agents
+        # Simplified issues - keep only the most important ones (top 3)
+        fixes = ""
+        if result.issues:
+            fixes = "*What to fix:*\n" + "".join(
+                f"• {self._simplify_issue_text(issue)}\n" for issue in islice(result.issues, 3)
+            )
 
-        return response
+        return _FAIL_TMPL.format(
+            step=result.step,
+            step_name=result.step_name,
+            score=result.score,
+            threshold=threshold,
+            fixes=fixes,
+            recommendation=self._simplify_recommendation(result.recommendation),
+            done=session.completed_count,
+        )
     
     def _simplify_issue_text(self, issue: str) -> str:
         """Convert technical language to simple terms for field agents"""
-        # Common replacements for technical terms
-        replacements = {
-            'ONT': 'white box',
-            'fiber cable': 'cable',
-            'pigtail screw': 'cable entry point',
-            'duct entry': 'cable hole',
-            'weather-proofing': 'weather protection',
-            'penetration': 'hole',
-            'installation area': 'work area',
-            'equipment': 'devices',
-            'visible and stable': 'clear and steady',
-            'identifiable': 'clear',
-            'insufficient': 'not enough',
-            'not adequately documented': 'not clear enough',
-            'strain relief': 'cable support'
-        }
-        
-        simple_issue = issue.lower()
-        for tech_term, simple_term in replacements.items():
-            simple_issue = simple_issue.replace(tech_term.lower(), simple_term)
+        simple_issue = _SIMPLIFY_RE.sub(lambda m: _SIMPLIFY_MAP[m.group(0)], issue.lower())
         
         # Capitalize first letter
         return simple_issue.capitalize()
     
     def _simplify_recommendation(self, recommendation: str) -> str:
         """Convert technical recommendations to simple actions"""
-        # Common action simplifications
-        simple_rec = recommendation.lower()
-        
-        # Key action words to make it more actionable
-        if 'wider' in simple_rec or 'step back' in simple_rec:
-            return "Step further back to fit more in the photo"
-        elif 'closer' in simple_rec or 'close-up' in simple_rec:
-            return "Get closer to show more detail"
-        elif 'angle' in simple_rec:
-            return "Try a different angle - move to the side or front"
-        elif 'lighting' in simple_rec or 'light' in simple_rec:
-            return "Take the photo in better light or use your phone's flash"
-        elif 'clear' in simple_rec:
-            return "Make sure the camera is focused and the image is sharp"
-        elif 'visible' in simple_rec:
-            return "Make sure you can clearly see what's needed in the photo"
-        else:
-            # Generic advice
-            return "Take a clearer photo showing what's needed for this step"
+        # One scan for all action words; the highest-priority match wins
+        found = {m.lastgroup for m in _REC_RE.finditer(recommendation.lower())}
+        for group in _REC_PRIORITY:
+            if group in found:
+                return _REC_ACTIONS[group]
+
+        # Generic advice
+        return "Take a clearer photo showing what's needed for this step"
 
     def _generate_completion_message(self, session) -> str:
         """Generate message for completed installation"""
-        return (
-            f"🎉 *Installation Already Completed!*\n\n"
-            f"📋 Job ID: {session.current_job_id}\n"
-            f"✅ All 12 steps successfully verified\n"
-            f"🚀 Ready for service activation\n\n"
-            f"Type 'NEW' to start another installation."
-        )
+        return _COMPLETION_TMPL.format(job_id=session.current_job_id)
 
     def _generate_error_response(self) -> str:
         """Generate error response message"""
-        return (
-            "❌ *System Error*\n\n"
-            "We encountered an error processing your request. "
-            "Please try again in a moment.\n\n"
-            "If problems persist, contact your supervisor."
-        )
+        return _ERROR_MSG
 
-    def _normalize_phone_number(self, phone_number: str) -> str:
-        """Normalize phone number format"""
-        # Remove WhatsApp prefix and standardize format
-        normalized = phone_number.replace('whatsapp:', '').replace('+', '')
-        return f"+{normalized}" if not normalized.startswith('+') else normalized
+    _normalize_phone_number = staticmethod(normalize_phone_number)
 
     def _handle_text_input(self, from_number: str, message_body: str) -> str:
         """Handle text input based on current session state"""
         session = self.session_manager.get_session(from_number)
         
-        logger.info(f"Text input handler: from={from_number}, message={message_body}, session_exists={session is not None}")
+        logger.info("Text input handler: from=%s, message=%s, session_exists=%s",
+                    from_number, message_body, session is not None)
         if session:
-            logger.info(f"Session current_step: {session.current_step}, dr_number: {session.dr_number}")
+            logger.info("Session current_step: %s, dr_number: %s", session.current_step, session.dr_number)
         
         if not session:
             logger.info("No session found for text input")
             return self._handle_unknown_command(from_number, message_body)
             
-        # Check if it's a DR number (for switching/creating installations)
+        # Check if it's a DR number (for switching/creating installations).
+        # process_message has already stripped and upper-cased short bodies,
+        # so a DR number that passes here is in its normalized form
         if self._is_valid_dr_number(message_body):
             logger.info("Routing DR number to DR input handler")
             return self._handle_dr_input(from_number, message_body)
         elif session.current_step == 0:  # Awaiting initial DR number
-            logger.info("Routing to DR input handler for initial setup")
-            return self._handle_dr_input(from_number, message_body)
+            logger.info("Invalid DR number during initial setup")
+            return _INVALID_DR_TMPL.format(dr_input=message_body.upper())
         else:
-            logger.info(f"Unknown text input for step {session.current_step}")
+            logger.info("Unknown text input for step %s", session.current_step)
             return self._handle_unknown_command(from_number, message_body)
     
     def _handle_dr_input(self, from_number: str, dr_input: str) -> str:
-        """Handle DR number input with multi-installation support"""
-        dr_input = dr_input.strip().upper()
-        
-        # Validate DR number format
-        if not self._is_valid_dr_number(dr_input):
-            return (
-                f"❌ *Invalid DR Number Format*\n\n"
-                f"You entered: {dr_input}\n\n"
-                f"Please use the correct format:\n"
-                f"• DR followed by 4-10 digits\n"
-                f"• Example: DR0123456\n\n"
-                f"Please try again:"
-            )
-        
+        """Handle DR number input with multi-installation support
+
+        dr_input is a DR number already validated and normalized by
+        _handle_text_input.
+        """
         # Use multi-installation switching
         session = self.session_manager.get_session(from_number)
         if not session:
@@ -613,66 +826,49 @@ class FiberInstallationBot:
         # Check if switching to existing installation
         is_existing = dr_input in session.installations or dr_input == session.current_dr
         
-        # Switch to or create installation
+        # Switch to or create installation (dr_input is already normalized)
         success = self.session_manager.switch_to_dr(from_number, dr_input)
         
         if not success:
-            return (
-                f"❌ *Installation Limit Reached*\n\n"
-                f"You can only manage 10 installations at once.\n"
-                f"Please complete or cancel existing installations first.\n\n"
-                f"Type 'LIST' to see your active installations."
-            )
-            
-        # Get updated session
-        session = self.session_manager.get_session(from_number)
+            return _DR_LIMIT_MSG
         
+        # switch_to_dr updates the session object in place; read it once
+        current_step = session.current_step
+        job_id = session.current_job_id
         if is_existing:
             # Switching to existing installation
-            if session.current_step == -1:
-                return (
-                    f"🔄 *Switched to DR {dr_input}*\n\n"
-                    f"📋 Job ID: {session.current_job_id}\n"
-                    f"📍 *Location Verification Required*\n"
-                    f"Please share your current location using WhatsApp's location sharing feature."
-                )
-            elif 1 <= session.current_step <= 12:
-                from ..prompts import STEP_NAMES, STEP_REQUIREMENTS
-                step_name = STEP_NAMES.get(session.current_step, f"Step {session.current_step}")
-                progress = (len(session.completed_steps) / 12) * 100
-                return (
-                    f"🔄 *Switched to DR {dr_input}*\n\n"
-                    f"📋 Job ID: {session.current_job_id}\n"
-                    f"📈 Progress: {len(session.completed_steps)}/12 steps ({progress:.0f}%)\n\n"
-                    f"📷 *Current Step: {step_name}*\n"
-                    f"{STEP_REQUIREMENTS.get(session.current_step, 'Please send photo for this step.')}\n\n"
-                    f"📍 Location: {'✅ Verified' if session.location_verified else '❌ Not verified'}"
+            if current_step == -1:
+                return _SWITCHED_LOCATION_TMPL.format(dr_input=dr_input, job_id=job_id)
+            elif 1 <= current_step <= 12:
+                done = session.completed_count
+                return _SWITCHED_STEP_TMPL.format(
+                    dr_input=dr_input,
+                    job_id=job_id,
+                    done=done,
+                    percent=_PROGRESS_PCT[min(done, 12)],
+                    step_name=STEP_NAMES_TUPLE[current_step],
+                    requirements=STEP_REQUIREMENTS_TUPLE[current_step],
+                    location='✅ Verified' if session.location_verified else '❌ Not verified',
                 )
             else:
-                return f"🎉 *Installation DR {dr_input} is completed!*"
+                return _DR_COMPLETED_TMPL.format(dr_input=dr_input)
         else:
             # New installation created
-            return (
-                f"✅ *New Installation Created*\n\n"
-                f"📄 DR Number: {dr_input}\n"
-                f"📋 Job ID: {session.current_job_id}\n\n"
-                f"📍 *Location Verification Required*\n"
-                f"Please share your current location using WhatsApp's location sharing feature:\n\n"
-                f"1. Tap the attachment (📎) icon\n"
-                f"2. Select 'Location'\n"
-                f"3. Choose 'Share Live Location' or 'Send Your Current Location'\n\n"
-                f"🎯 This ensures you're at the correct installation site."
-            )
+            return _LOC_PROMPT_TMPL.format(dr_input=dr_input, job_id=job_id)
     
-    def _handle_location_message(self, from_number: str, media_url: str) -> str:
+    def _handle_location_message(self, from_number: str, media_url: Optional[str],
+                                 location: Optional[Dict] = None) -> str:
         """Handle location sharing message"""
         session = self.session_manager.get_session(from_number)
         
         if not session or session.current_step != -1:
             return "❌ Location sharing not expected at this time. Please follow the installation steps."
         
-        # Store location data and move to Step 1
-        location_data = {"media_url": media_url, "timestamp": datetime.now().isoformat()}
+        # Store location data and move to Step 1 (epoch ns; nothing reads it back
+        # on the request path, so skip building a datetime/ISO string)
+        location_data = {"media_url": media_url, "timestamp_ns": time.time_ns()}
+        if location:
+            location_data.update(location)
         self.session_manager.update_session(
             from_number, 
             location_verified=True, 
@@ -680,47 +876,35 @@ class FiberInstallationBot:
             current_step=1
         )
         
-        response_msg = (
-            f"✅ *Location Verified*\n\n"
-            f"📍 Location recorded successfully\n"
-            f"📄 DR Number: {session.dr_number}\n\n"
-            f"📷 *Step 1: Property Frontage*\n"
-            f"{STEP_REQUIREMENTS[1]}\n\n"
-            f"Please send a clear photo showing the house/building with street number visible."
-        )
+        response_msg = _STEP1_MSG_TEMPLATE.format(dr_number=session.dr_number)
         
-        logger.info(f"Location verified for {from_number}, moving to Step 1")
+        logger.info("Location verified for %s, moving to Step 1", from_number)
         return response_msg
     
     def _is_location_message(self, media_url: str) -> bool:
         """Check if the media URL indicates a location share"""
-        # WhatsApp location shares typically have specific URL patterns
-        if not media_url:
-            return False
-        
-        # More specific location detection - only consider it a location if URL explicitly contains location keywords
-        location_indicators = ['location', 'maps', 'coordinates', 'lat=', 'lng=', 'geo:']
-        
-        # Check for explicit location indicators in the URL
-        url_lower = media_url.lower()
-        return any(indicator in url_lower for indicator in location_indicators)
+        # Only consider it a location if the URL explicitly contains location keywords
+        return bool(media_url) and _LOC_RE.search(media_url) is not None
     
     def _is_valid_dr_number(self, dr_input: str) -> bool:
         """Validate DR number format"""
-        import re
-        # DR followed by 4-10 digits (flexible for different formats)
-        pattern = r'^DR\d{4,10}$'
-        return bool(re.match(pattern, dr_input))
+        return _DR_RE.match(dr_input) is not None
 
     def get_bot_stats(self) -> Dict:
-        """Get bot statistics"""
-        session_stats = self.session_manager.get_session_stats()
-
-        return {
-            "bot_status": "active",
-            "total_sessions": session_stats["total_sessions"],
-            "active_installations": session_stats["active_sessions"],
-            "completed_installations": session_stats["completed_sessions"],
-            "average_steps_per_session": session_stats["average_steps_completed"],
-            "uptime": "active since start"
-        }
+        """Get bot statistics (recomputed at most once per _STATS_TTL seconds)"""
+        now = time.monotonic()
+        expiry, stats = self._stats_cache
+        if now >= expiry:
+            session_stats = self.session_manager.get_session_stats()
+            stats = {
+                "bot_status": "active",
+                "total_sessions": session_stats["total_sessions"],
+                "active_installations": session_stats["active_sessions"],
+                "completed_installations": session_stats["completed_sessions"],
+                "average_steps_per_session": session_stats["average_steps_completed"],
+                "uptime": "active since start"
+            }
+            self._stats_cache = (now + _STATS_TTL, stats)
+
+        # Callers add their own fields; keep the cached copy clean
+        return dict(stats)
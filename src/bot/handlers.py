@@ -1,20 +1,65 @@
 import os
 import requests
 import logging
+import threading
 from typing import Optional
 from datetime import datetime
 from PIL import Image
 import io
+from twilio.rest import Client
 from ..config import Config
 
 logger = logging.getLogger(__name__)
 
+# Shared Twilio REST client; its HTTP client keeps a pooled keep-alive session
+_twilio_client: Optional[Client] = None
+_twilio_lock = threading.Lock()
+
+
+def get_twilio_client() -> Client:
+    """Return the process-wide Twilio client, creating it on first use"""
+    global _twilio_client
+    if _twilio_client is None:
+        with _twilio_lock:
+            if _twilio_client is None:
+                _twilio_client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
+    return _twilio_client
+
+
+def send_whatsapp_message(to_number: str, body: str):
+    """
+    Send an outbound WhatsApp message through Twilio
+
+    Args:
+        to_number: Recipient number, with or without the 'whatsapp:' prefix
+        body: Message text
+
+    Returns:
+        Twilio message resource (has .sid and .status)
+    """
+    if not to_number.startswith('whatsapp:'):
+        to_number = f"whatsapp:{to_number}"
+
+    return get_twilio_client().messages.create(
+        from_=f"whatsapp:{Config.WHATSAPP_NUMBER}",
+        to=to_number,
+        body=body
+    )
+
+
 class MessageHandler:
     """Handles WhatsApp message operations and media downloads"""
 
     def __init__(self):
         self.twilio_account_sid = Config.TWILIO_ACCOUNT_SID
         self.twilio_auth_token = Config.TWILIO_AUTH_TOKEN
+        # Shared session so media downloads reuse pooled keep-alive connections
+        self.http = requests.Session()
+        self.http.auth = (self.twilio_account_sid, self.twilio_auth_token)
+
+    def send_message(self, to_number: str, body: str):
+        """Send an outbound (non-reply) WhatsApp message"""
+        return send_whatsapp_message(to_number, body)
 
     def download_photo(self, media_url: str, job_id: str) -> Optional[str]:
         """
@@ -32,11 +77,7 @@ class MessageHandler:
             media_id = media_url.split('/')[-1].split('.')[0]
 
             # Download the media content directly from the provided URL
-            media_response = requests.get(
-                media_url,
-                auth=(self.twilio_account_sid, self.twilio_auth_token),
-                timeout=30
-            )
+            media_response = self.http.get(media_url, timeout=30)
 
             if media_response.status_code != 200:
                 logger.error(f"Failed to download media: {media_response.status_code}")
@@ -34,6 +34,7 @@ class Config:
     MAX_PHOTO_SIZE_MB = 10
     COMPRESSION_QUALITY = 85
     MAX_PHOTO_DIMENSION = 1024
+    VERIFY_WORKERS = int(os.getenv('VERIFY_WORKERS', '8'))  # concurrent OpenAI verifications
 
     # Installation Steps Configuration
     TOTAL_INSTALLATION_STEPS = 12
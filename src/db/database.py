@@ -4,9 +4,16 @@ Provides SQLAlchemy engine and session management
 """
 
 import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import List, Tuple
+from psycopg2.extras import execute_values
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import QueuePool
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,10 +26,25 @@ if not DATABASE_URL:
     engine = None
     SessionLocal = None
 else:
-    # Create engine with connection pooling disabled for serverless
+    url = make_url(DATABASE_URL)
+    if url.drivername in ('postgresql', 'postgres'):
+        # Pin the driver we ship (psycopg2-binary); SQLAlchemy 2.1 defaults to psycopg 3
+        url = url.set(drivername='postgresql+psycopg2')
+    if '-pooler' in (url.host or '') and 'sslmode' not in url.query:
+        # Neon's PgBouncer endpoint only accepts TLS connections
+        url = url.update_query_dict({'sslmode': 'require'})
+
+    # Long-running web process: keep warm connections instead of paying
+    # TCP + TLS + backend startup on every query. Against Neon's -pooler
+    # endpoint this pools client->PgBouncer connections (psycopg2 does not
+    # use server-side prepared statements, so transaction mode is safe).
     engine = create_engine(
-        DATABASE_URL,
-        poolclass=NullPool,  # No connection pooling for serverless
+        url,
+        poolclass=QueuePool,
+        pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+        max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        pool_pre_ping=True,  # Drop connections Neon closed while idle
+        pool_recycle=300,  # Recycle before Neon's idle timeout / autosuspend
         echo=False,  # Set to True for SQL query logging
     )
 
@@ -32,10 +54,79 @@ else:
     logger.info("✅ Database engine created successfully")
 
 
+# ==================== SQL STATEMENTS ====================
+# Built once at import; psycopg2 interpolates parameters client-side, so
+# these stay safe behind Neon's transaction-mode PgBouncer pooler.
+# QA review rows set every step flag plus completed/incomplete to false
+# explicitly, so they don't depend on migrations/002 having been applied.
+
+_QA_FLAG_COLUMNS = """
+    step_01_house_photo, step_02_cable_from_pole, step_03_cable_entry_outside,
+    step_04_cable_entry_inside, step_05_wall_for_installation, step_06_ont_back_after_install,
+    step_07_power_meter_reading, step_08_ont_barcode, step_09_ups_serial,
+    step_10_final_installation, step_11_green_lights, step_12_customer_signature,
+    completed, incomplete
+"""
+_QA_FLAG_FALSES = ", ".join(["false"] * 14)
+
+_SQL_PING = text("SELECT 1")
+
+_SQL_SAVE_INSTALLATION = text(f"""
+    WITH ins AS (
+        INSERT INTO installations (drop_number, contractor_name, project_name, status, date_submitted)
+        SELECT :drop_number, :contractor_name, :project_name, 'submitted', NOW()
+        WHERE NOT EXISTS (
+            SELECT 1 FROM installations WHERE drop_number = :drop_number
+        )
+        RETURNING drop_number
+    ), qa AS (
+        INSERT INTO qa_photo_reviews (drop_number, review_date, user_name, project, {_QA_FLAG_COLUMNS})
+        SELECT drop_number, CURRENT_DATE, 'QA Team', :project_name, {_QA_FLAG_FALSES}
+        FROM ins
+        ON CONFLICT (drop_number, review_date) DO NOTHING
+    )
+    SELECT drop_number FROM ins
+""")
+
+_SQL_MARK_RESUBMITTED = text("""
+    UPDATE qa_photo_reviews
+    SET incomplete = false,
+        feedback_sent = NULL,
+        updated_at = NOW()
+    WHERE drop_number = :drop_number
+    RETURNING drop_number
+""")
+
+# Multi-row inserts for save_installations_bulk, expanded by psycopg2's
+# execute_values into a single VALUES list (one round trip per batch).
+# Existing drops are skipped with the same NOT EXISTS guard as
+# _SQL_SAVE_INSTALLATION, so neither path needs a unique index on
+# installations.drop_number (migrations/001 only speeds the guard up)
+_SQL_INSERT_INSTALLATIONS = """
+    INSERT INTO installations (drop_number, contractor_name, project_name, status, date_submitted)
+    SELECT v.drop_number, v.contractor_name, v.project_name, 'submitted', NOW()
+    FROM (VALUES %s) AS v (drop_number, contractor_name, project_name)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM installations WHERE drop_number = v.drop_number
+    )
+    RETURNING drop_number
+"""
+_INSTALLATION_ROW = "(%s, %s, %s)"
+
+_SQL_INSERT_QA_REVIEWS = f"""
+    INSERT INTO qa_photo_reviews (drop_number, review_date, user_name, project, {_QA_FLAG_COLUMNS})
+    VALUES %s
+    ON CONFLICT (drop_number, review_date) DO NOTHING
+"""
+_QA_REVIEW_ROW = f"(%s, CURRENT_DATE, 'QA Team', %s, {_QA_FLAG_FALSES})"
+
+
 def get_db() -> Session:
     """
     Get a database session
 
+    The Session is its own context manager and closes itself on exit.
+
     Usage:
         with get_db() as db:
             result = db.execute(text("SELECT * FROM installations"))
@@ -43,11 +134,19 @@ def get_db() -> Session:
     if SessionLocal is None:
         raise RuntimeError("Database not configured. Set NEON_DATABASE_URL environment variable.")
 
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    return SessionLocal()
+
+
+# A successful probe is reused for HEALTH_TTL seconds so frequent health
+# checks do not each take a connection and round trip to Neon. Failures are
+# never cached, and any failed query below expires the cached success.
+HEALTH_TTL = 10.0
+_health = {"ok": False, "msg": "", "ts": 0.0}
+
+
+def _invalidate_health() -> None:
+    """Force the next test_connection call to probe the database"""
+    _health["ok"] = False
 
 
 def test_connection():
@@ -55,14 +154,63 @@ def test_connection():
     if engine is None:
         return False, "Database not configured"
 
+    now = time.monotonic()
+    if _health["ok"] and now - _health["ts"] < HEALTH_TTL:
+        return True, _health["msg"]
+
     try:
         with engine.connect() as conn:
-            result = conn.execute(text("SELECT 1"))
+            result = conn.execute(_SQL_PING)
             result.fetchone()
-        return True, "Database connection successful"
     except Exception as e:
+        _invalidate_health()
         return False, f"Database connection failed: {str(e)}"
 
+    _health.update(ok=True, msg="Database connection successful", ts=now)
+    return True, _health["msg"]
+
+
+# ==================== KNOWN DROP CACHE ====================
+# Drop numbers this process has already seen in the installations table.
+# Re-submissions of a recent DR (agents re-sending "DONE", dashboard
+# retries) are answered without a database round trip. Installations are
+# never deleted by this service; a row removed externally is only
+# forgotten once it falls out of the LRU or the process restarts.
+
+KNOWN_DROPS_MAX = 4096
+
+_known_drops: "OrderedDict[str, None]" = OrderedDict()
+_known_drops_lock = threading.Lock()
+
+
+def _is_known_drop(drop_number: str) -> bool:
+    """Check (and refresh) a drop number in the known-drops LRU"""
+    with _known_drops_lock:
+        if drop_number in _known_drops:
+            _known_drops.move_to_end(drop_number)
+            return True
+        return False
+
+
+def _remember_drops(drop_numbers) -> None:
+    """Record drop numbers that are now known to exist in the database"""
+    with _known_drops_lock:
+        for drop_number in drop_numbers:
+            _known_drops[drop_number] = None
+            _known_drops.move_to_end(drop_number)
+        while len(_known_drops) > KNOWN_DROPS_MAX:
+            _known_drops.popitem(last=False)
+
+
+def _exists_result(drop_number: str) -> dict:
+    """Result returned when an installation is already in the database"""
+    return {
+        "success": True,
+        "action": "exists",
+        "drop_number": drop_number,
+        "message": "Installation already exists"
+    }
+
 
 def save_installation(drop_number: str, contractor_name: str, project_name: str = "Velo Test"):
     """
@@ -79,78 +227,45 @@ def save_installation(drop_number: str, contractor_name: str, project_name: str
     if engine is None:
         return {"success": False, "error": "Database not configured"}
 
-    try:
-        with engine.connect() as conn:
-            # Check if installation already exists
-            existing = conn.execute(
-                text("SELECT id FROM installations WHERE drop_number = :drop_number"),
-                {"drop_number": drop_number}
-            ).fetchone()
+    if _is_known_drop(drop_number):
+        return _exists_result(drop_number)
 
-            if existing:
-                logger.info(f"Installation {drop_number} already exists")
-                return {
-                    "success": True,
-                    "action": "exists",
-                    "drop_number": drop_number,
-                    "message": "Installation already exists"
-                }
-
-            # Insert new installation
-            conn.execute(
-                text("""
-                    INSERT INTO installations (drop_number, contractor_name, project_name, status, date_submitted)
-                    VALUES (:drop_number, :contractor_name, :project_name, 'submitted', NOW())
-                """),
+    try:
+        # One statement, one transaction: insert the installation unless it
+        # exists and seed its QA review row (all 12 steps = false) from the
+        # same CTE; a returned row means it was created
+        with engine.begin() as conn:
+            inserted = conn.execute(
+                _SQL_SAVE_INSTALLATION,
                 {
                     "drop_number": drop_number,
                     "contractor_name": contractor_name,
                     "project_name": project_name
                 }
-            )
-            conn.commit()
-
-            logger.info(f"✅ Saved installation {drop_number} to database")
-
-            # Create QA photo review record with all 12 steps = false
-            conn.execute(
-                text("""
-                    INSERT INTO qa_photo_reviews (
-                        drop_number, review_date, user_name, project,
-                        step_01_house_photo, step_02_cable_from_pole, step_03_cable_entry_outside,
-                        step_04_cable_entry_inside, step_05_wall_for_installation, step_06_ont_back_after_install,
-                        step_07_power_meter_reading, step_08_ont_barcode, step_09_ups_serial,
-                        step_10_final_installation, step_11_green_lights, step_12_customer_signature,
-                        completed, incomplete
-                    ) VALUES (
-                        :drop_number, CURRENT_DATE, 'QA Team', :project_name,
-                        false, false, false, false, false, false,
-                        false, false, false, false, false, false,
-                        false, false
-                    )
-                    ON CONFLICT (drop_number, review_date) DO NOTHING
-                """),
-                {
-                    "drop_number": drop_number,
-                    "project_name": project_name
-                }
-            )
-            conn.commit()
+            ).fetchone()
 
-            logger.info(f"✅ Created QA review record for {drop_number}")
+        _remember_drops((drop_number,))
 
-            return {
-                "success": True,
-                "action": "created",
-                "drop_number": drop_number,
-                "message": "Installation saved and ready for QA review"
-            }
+        if inserted is None:
+            logger.info(f"Installation {drop_number} already exists")
+            return _exists_result(drop_number)
+
+        logger.info(f"✅ Saved installation {drop_number} and QA review record to database")
+
+        return {
+            "success": True,
+            "action": "created",
+            "drop_number": drop_number,
+            "message": "Installation saved and ready for QA review"
+        }
 
     except Exception as e:
-        logger.error(f"❌ Failed to save installation {drop_number}: {str(e)}")
+        err = str(e)
+        _invalidate_health()
+        logger.exception("❌ Failed to save installation %s", drop_number)
         return {
             "success": False,
-            "error": str(e),
+            "error": err,
             "drop_number": drop_number
         }
 
@@ -169,21 +284,14 @@ def mark_resubmitted(drop_number: str):
         return {"success": False, "error": "Database not configured"}
 
     try:
-        with engine.connect() as conn:
+        with engine.begin() as conn:
             # Update QA review to clear incomplete flag and feedback_sent
-            result = conn.execute(
-                text("""
-                    UPDATE qa_photo_reviews
-                    SET incomplete = false,
-                        feedback_sent = NULL,
-                        updated_at = NOW()
-                    WHERE drop_number = :drop_number
-                """),
+            updated = conn.execute(
+                _SQL_MARK_RESUBMITTED,
                 {"drop_number": drop_number}
-            )
-            conn.commit()
+            ).first()
 
-            if result.rowcount > 0:
+            if updated is not None:
                 logger.info(f"✅ Marked {drop_number} as resubmitted")
                 return {
                     "success": True,
@@ -199,9 +307,174 @@ def mark_resubmitted(drop_number: str):
                 }
 
     except Exception as e:
-        logger.error(f"❌ Failed to mark {drop_number} as resubmitted: {str(e)}")
+        err = str(e)
+        _invalidate_health()
+        logger.exception("❌ Failed to mark %s as resubmitted", drop_number)
+        return {
+            "success": False,
+            "error": err,
+            "drop_number": drop_number
+        }
+
+
+# ==================== BUFFERED INSTALLATION WRITES ====================
+# One writer thread saves queued submissions. An idle writer writes a row
+# straight away; rows that arrive while a write is in flight (dashboard bulk
+# actions, backlog flushes) collect in the buffer and go out together in the
+# next transaction instead of one round trip to Neon per installation.
+
+WRITE_BATCH_SIZE = 50
+
+_write_buf: List[tuple] = []
+_write_lock = threading.Lock()
+_write_event = threading.Event()
+_writer_thread = None
+
+
+def save_installations_bulk(items: List[Tuple[str, str, str]]):
+    """
+    Save several installations in one transaction
+
+    Args:
+        items: (drop_number, contractor_name, project_name) tuples
+
+    Returns:
+        list: One result dict per item, in the same shape as save_installation
+    """
+    if engine is None:
+        return [{"success": False, "error": "Database not configured"} for _ in items]
+
+    drop_numbers = [item[0] for item in items]
+
+    # First occurrence wins when a drop appears more than once in the batch
+    rows = {}
+    for item in items:
+        rows.setdefault(item[0], item)
+
+    try:
+        with engine.begin() as conn, conn.connection.cursor() as cursor:
+            # Rows that already exist are skipped by NOT EXISTS; the ones
+            # actually inserted come back from RETURNING
+            created = {
+                row[0] for row in execute_values(
+                    cursor, _SQL_INSERT_INSTALLATIONS, list(rows.values()),
+                    template=_INSTALLATION_ROW, fetch=True
+                )
+            }
+
+            if created:
+                execute_values(
+                    cursor, _SQL_INSERT_QA_REVIEWS,
+                    [(drop_number, rows[drop_number][2]) for drop_number in created],
+                    template=_QA_REVIEW_ROW
+                )
+
+        _remember_drops(rows)
+        logger.info("✅ Saved %s of %s installations in one batch", len(created), len(items))
+
+    except Exception as e:
+        err = str(e)
+        _invalidate_health()
+        logger.exception("❌ Failed to save installation batch %s", drop_numbers)
+        return [
+            {"success": False, "error": err, "drop_number": drop_number}
+            for drop_number in drop_numbers
+        ]
+
+    results = []
+    for drop_number in drop_numbers:
+        if drop_number in created:
+            # Later duplicates of the same drop in this batch report "exists"
+            created.discard(drop_number)
+            results.append({
+                "success": True,
+                "action": "created",
+                "drop_number": drop_number,
+                "message": "Installation saved and ready for QA review"
+            })
+        else:
+            results.append(_exists_result(drop_number))
+    return results
+
+
+def queue_installation(drop_number: str, contractor_name: str, project_name: str = "Velo Test",
+                       timeout: float = 2.0):
+    """
+    Queue an installation for the batched writer and wait for its result
+
+    Args:
+        drop_number: Drop number (e.g., DR12345678)
+        contractor_name: WhatsApp number or contractor identifier
+        project_name: Project name (default: "Velo Test")
+        timeout: Seconds to wait for the batch containing this row
+
+    Returns:
+        dict: Result with success status, as returned by save_installation.
+        On timeout the result is a failure with "retryable": True; the row is
+        dropped from the queue if its batch has not started yet, otherwise it
+        may still be written and a retry then reports "exists"
+    """
+    if engine is None:
+        return {"success": False, "error": "Database not configured"}
+
+    # Known duplicates skip the writer queue entirely
+    if _is_known_drop(drop_number):
+        return _exists_result(drop_number)
+
+    future = Future()
+    with _write_lock:
+        _write_buf.append((drop_number, contractor_name, project_name, future))
+        _start_writer()
+    _write_event.set()
+
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        # Withdraw the row unless the writer has already picked it up
+        future.cancel()
+        logger.error("❌ Timed out waiting to save installation %s", drop_number)
         return {
             "success": False,
-            "error": str(e),
+            "retryable": True,
+            "error": "Timed out waiting for database write",
             "drop_number": drop_number
         }
+
+
+def _start_writer():
+    """Start the writer thread if it is not running (call with _write_lock held)"""
+    global _writer_thread
+    if _writer_thread is None or not _writer_thread.is_alive():
+        _writer_thread = threading.Thread(
+            target=_installation_writer, name="installation-writer", daemon=True
+        )
+        _writer_thread.start()
+
+
+def _installation_writer():
+    """Drain the write buffer in batches of up to WRITE_BATCH_SIZE rows"""
+    while True:
+        _write_event.wait()
+
+        with _write_lock:
+            batch = _write_buf[:WRITE_BATCH_SIZE]
+            del _write_buf[:WRITE_BATCH_SIZE]
+            if not _write_buf:
+                _write_event.clear()
+
+        # Skip rows whose caller timed out (and was told to retry) while queued
+        batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+        if not batch:
+            continue
+
+        try:
+            results = save_installations_bulk([item[:3] for item in batch])
+        except Exception as e:
+            err = str(e)
+            results = [
+                {"success": False, "error": err, "drop_number": item[0]}
+                for item in batch
+            ]
+
+        for item, result in zip(batch, results):
+            item[3].set_result(result)
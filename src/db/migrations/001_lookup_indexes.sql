@@ -0,0 +1,21 @@
+-- Migration 001: indexes backing the lookups in src/db/database.py
+--
+-- installations.drop_number        -> NOT EXISTS guards in save_installation and
+--                                     save_installations_bulk (the code does not rely on it
+--                                     being unique; it keeps the guard an index lookup)
+-- qa_photo_reviews(drop_number,
+--                  review_date)    -> ON CONFLICT (drop_number, review_date) arbiter and the
+--                                     WHERE drop_number = ... UPDATE in mark_resubmitted
+--
+-- Run once against Neon (outside a transaction, CONCURRENTLY avoids locking writes):
+--   psql "$NEON_DATABASE_URL" -f src/db/migrations/001_lookup_indexes.sql
+--
+-- The unique index on installations fails if duplicate drop numbers already exist;
+-- find them first with:
+--   SELECT drop_number, count(*) FROM installations GROUP BY drop_number HAVING count(*) > 1;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS installations_drop_number_uidx
+    ON installations (drop_number);
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS qa_photo_reviews_drop_date_uidx
+    ON qa_photo_reviews (drop_number, review_date);
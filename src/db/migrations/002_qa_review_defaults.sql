@@ -0,0 +1,28 @@
+-- Migration 002: column defaults for the QA review checklist
+--
+-- Optional safety net: save_installation and save_installations_bulk in
+-- src/db/database.py still write every step flag plus completed/incomplete
+-- as false explicitly, so the service does not depend on this migration.
+-- With it applied, rows inserted by other tools (dashboard, manual SQL) also
+-- start out false instead of NULL.
+--
+-- Run once against Neon:
+--   psql "$NEON_DATABASE_URL" -f src/db/migrations/002_qa_review_defaults.sql
+--
+-- SET DEFAULT only touches the catalog; existing rows are not rewritten.
+
+ALTER TABLE qa_photo_reviews
+    ALTER COLUMN step_01_house_photo SET DEFAULT false,
+    ALTER COLUMN step_02_cable_from_pole SET DEFAULT false,
+    ALTER COLUMN step_03_cable_entry_outside SET DEFAULT false,
+    ALTER COLUMN step_04_cable_entry_inside SET DEFAULT false,
+    ALTER COLUMN step_05_wall_for_installation SET DEFAULT false,
+    ALTER COLUMN step_06_ont_back_after_install SET DEFAULT false,
+    ALTER COLUMN step_07_power_meter_reading SET DEFAULT false,
+    ALTER COLUMN step_08_ont_barcode SET DEFAULT false,
+    ALTER COLUMN step_09_ups_serial SET DEFAULT false,
+    ALTER COLUMN step_10_final_installation SET DEFAULT false,
+    ALTER COLUMN step_11_green_lights SET DEFAULT false,
+    ALTER COLUMN step_12_customer_signature SET DEFAULT false,
+    ALTER COLUMN completed SET DEFAULT false,
+    ALTER COLUMN incomplete SET DEFAULT false;
@@ -1,234 +1,155 @@
 """Verification prompts for each installation step"""
 
-INSTALLATION_STEP_PROMPTS = {
-    "step1_frontage": """
-    You are a fiber installation quality expert. Analyze this property frontage photo for Step 1 of fiber installation.
-
-    Verification criteria:
-    - House/building clearly visible and identifiable
-    - Street number visible if present (not required)
-
-    Respond in JSON format only:
-    {
-        "passed": true/false,
-        "score": 0-10,
-        "issues": ["list of specific problems found"],
-        "confidence": 0.00-1.00,
-        "recommendation": "specific advice for improvement if needed"
-    }
-    """,
-
-    "step2_cable_span": """
-    You are a fiber installation quality expert. Analyze this outside cable span photo for Step 2.
-
-    Verification criteria:
-    - Wide shot showing full cable span from pole to pigtail screw
-    - Full span clearly visible in single frame
-    - Connection points identifiable at both ends
-
-    Respond in JSON format only:
-    {
-        "passed": true/false,
-        "score": 0-10,
-        "issues": ["list of specific problems found"],
-        "confidence": 0.00-1.00,
-        "recommendation": "specific advice for improvement if needed"
-    }
-    """,
-
-    "step3_entry_outside_closeup": """
-    You are a fiber installation quality expert. Analyze this outside home entry point close-up photo for Step 3.
-
-    Verification criteria:
-    - Close-up view of pigtail screw or duct entry point
-    - Entry point clearly visible on exterior wall/roof
-    - Weather-proofing measures visible if installed
-
-    Respond in JSON format only:
-    {
-        "passed": true/false,
-        "score": 0-10,
-        "issues": ["list of specific problems found"],
-        "confidence": 0.00-1.00,
-        "recommendation": "specific advice for improvement if needed"
-    }
-    """,
-
-    "step4_entry_inside": """
-    You are a fiber installation quality expert. Analyze this inside home entry point photo for Step 4.
-
-    Verification criteria:
-    - Cable entry point clearly visible from inside
-    - Internal cable routing properly implemented
-    - Wall penetration properly sealed from inside
-
-    Respond in JSON format only:
-    {
-        "passed": true/false,
-        "score": 0-10,
-        "issues": ["list of specific problems found"],
-        "confidence": 0.00-1.00,
-        "recommendation": "specific advice for improvement if needed"
-    }
-    """,
-
-    "step5_wall_before": """
-    You are a fiber installation quality expert. Analyze this wall location photo (before installation) for Step 5.
-
-    Verification criteria:
-    - Clear view of intended ONT installation spot on wall
-    - Power outlet visible and accessible near installation area
-    - Wall surface condition visible and suitable for mounting
-    - Sufficient space for equipment installation
-    - No existing fiber equipment visible (pre-install state)
-
-    Respond in JSON format only:
-    {
-        "passed": true/false,
-        "score": 0-10,
-        "issues": ["list of specific problems found"],
-        "confidence": 0.00-1.00,
-        "recommendation": "specific advice for improvement if needed"
-    }
-    """,
-
-    "step6_fiber_to_ont": """
-    You are a fiber installation quality expert. Analyze this fiber entry to ONT photo for Step 6 (after installation).
-
-    Verification criteria:
-    - Back of router/ONT clearly visible
-    - Green clips or conduit properly installed
-    - Slack loop properly formed and secured
-    - Fiber cable properly routed and managed
-    - Professional cable management visible
-    - No excessive tension on fiber connections
-
-    Respond in JSON format only:
-    {
-        "passed": true/false,
-        "score": 0-10,
-        "issues": ["list of specific problems found"],
-        "confidence": 0.00-1.00,
-        "recommendation": "specific advice for improvement if needed"
-    }
-    """,
-
-    "step7_powermeter_ont": """
-    You are a fiber installation quality expert. Analyze this powermeter at ONT photo for Step 7.
+# Every step prompt shares the same preamble and JSON response schema;
+# only the photo subject, step label and criteria differ
+_PROMPT_TEMPLATE = """
+    You are a fiber installation quality expert. Analyze this {subject} for {step}.
 
     Verification criteria:
-    - Powermeter properly connected to ONT device
-    - Reading visible and stable on display
-    - Connection points secure and properly fitted
-    - Signal levels within acceptable technical range
+{criteria}
 
     Respond in JSON format only:
-    {
+    {{
         "passed": true/false,
         "score": 0-10,
         "issues": ["list of specific problems found"],
         "confidence": 0.00-1.00,
         "recommendation": "specific advice for improvement if needed"
-    }
-    """,
-
-    "step8_ont_barcode": """
-    You are a fiber installation quality expert. Analyze this ONT barcode and label photo for Step 8.
-
-    Verification criteria:
-    - ONT device clearly visible in the photo
-    - Barcode/QR code readable and in focus
-    - Serial number label clearly visible and readable
-    - Model information identifiable
-
-    Respond in JSON format only:
-    {
-        "passed": true/false,
-        "score": 0-10,
-        "issues": ["list of specific problems found"],
-        "confidence": 0.00-1.00,
-        "recommendation": "specific advice for improvement if needed"
-    }
-    """,
-
-    "step9_mini_ups": """
-    You are a fiber installation quality expert. Analyze this Mini-UPS serial number photo for Step 9.
-
-    Verification criteria:
-    - Mini-UPS device (Gizzu or similar) clearly visible
-    - Serial number label clearly readable
-    - Device properly connected to power and ONT
-    - Power indicators visible and functional
-
-    Respond in JSON format only:
-    {
-        "passed": true/false,
-        "score": 0-10,
-        "issues": ["list of specific problems found"],
-        "confidence": 0.00-1.00,
-        "recommendation": "specific advice for improvement if needed"
-    }
-    """,
-
-    "step10_work_area_complete": """
-    You are a fiber installation quality expert. Analyze this overall work area completion photo for Step 10.
-
-    Verification criteria:
-    - Complete installation area clearly visible
-    - Labeled Router/ONT device visible and properly positioned
-    - Fiber routing clean and professional
-    - Electrical outlet (plug) visible and accessible
-    - Work area clean and organized
-    - All equipment properly labeled
-    - Professional finished appearance
-
-    Respond in JSON format only:
-    {
-        "passed": true/false,
-        "score": 0-10,
-        "issues": ["list of specific problems found"],
-        "confidence": 0.00-1.00,
-        "recommendation": "specific advice for improvement if needed"
-    }
-    """,
-
-    "step11_active_light": """
-    You are a fiber installation quality expert. Analyze this active broadband light photo for Step 11.
-
-    Verification criteria:
-    - ONT device clearly visible
-    - Active green lights clearly ON and visible
-    - Fibertime sticker visible on or near ONT
-    - Drop number (Drop No.) visible
-    - No red or error lights showing on device
-    - Service activation confirmed by visual indicators
-
-    Respond in JSON format only:
-    {
-        "passed": true/false,
-        "score": 0-10,
-        "issues": ["list of specific problems found"],
-        "confidence": 0.00-1.00,
-        "recommendation": "specific advice for improvement if needed"
-    }
-    """,
-
-    "step12_customer_signature": """
-    You are a fiber installation quality expert. Analyze this customer signature photo for Step 12.
+    }}
+    """
 
-    Verification criteria:
-    - Digital signature clearly visible and readable
-    - Customer signature clearly present and legible
+# prompt key -> (photo subject, step label, verification criteria)
+_STEP_SPECS = {
+    "step1_frontage": (
+        "property frontage photo",
+        "Step 1 of fiber installation",
+        [
+            "House/building clearly visible and identifiable",
+            "Street number visible if present (not required)",
+        ],
+    ),
+    "step2_cable_span": (
+        "outside cable span photo",
+        "Step 2",
+        [
+            "Wide shot showing full cable span from pole to pigtail screw",
+            "Full span clearly visible in single frame",
+            "Connection points identifiable at both ends",
+        ],
+    ),
+    "step3_entry_outside_closeup": (
+        "outside home entry point close-up photo",
+        "Step 3",
+        [
+            "Close-up view of pigtail screw or duct entry point",
+            "Entry point clearly visible on exterior wall/roof",
+            "Weather-proofing measures visible if installed",
+        ],
+    ),
+    "step4_entry_inside": (
+        "inside home entry point photo",
+        "Step 4",
+        [
+            "Cable entry point clearly visible from inside",
+            "Internal cable routing properly implemented",
+            "Wall penetration properly sealed from inside",
+        ],
+    ),
+    "step5_wall_before": (
+        "wall location photo (before installation)",
+        "Step 5",
+        [
+            "Clear view of intended ONT installation spot on wall",
+            "Power outlet visible and accessible near installation area",
+            "Wall surface condition visible and suitable for mounting",
+            "Sufficient space for equipment installation",
+            "No existing fiber equipment visible (pre-install state)",
+        ],
+    ),
+    "step6_fiber_to_ont": (
+        "fiber entry to ONT photo",
+        "Step 6 (after installation)",
+        [
+            "Back of router/ONT clearly visible",
+            "Green clips or conduit properly installed",
+            "Slack loop properly formed and secured",
+            "Fiber cable properly routed and managed",
+            "Professional cable management visible",
+            "No excessive tension on fiber connections",
+        ],
+    ),
+    "step7_powermeter_ont": (
+        "powermeter at ONT photo",
+        "Step 7",
+        [
+            "Powermeter properly connected to ONT device",
+            "Reading visible and stable on display",
+            "Connection points secure and properly fitted",
+            "Signal levels within acceptable technical range",
+        ],
+    ),
+    "step8_ont_barcode": (
+        "ONT barcode and label photo",
+        "Step 8",
+        [
+            "ONT device clearly visible in the photo",
+            "Barcode/QR code readable and in focus",
+            "Serial number label clearly visible and readable",
+            "Model information identifiable",
+        ],
+    ),
+    "step9_mini_ups": (
+        "Mini-UPS serial number photo",
+        "Step 9",
+        [
+            "Mini-UPS device (Gizzu or similar) clearly visible",
+            "Serial number label clearly readable",
+            "Device properly connected to power and ONT",
+            "Power indicators visible and functional",
+        ],
+    ),
+    "step10_work_area_complete": (
+        "overall work area completion photo",
+        "Step 10",
+        [
+            "Complete installation area clearly visible",
+            "Labeled Router/ONT device visible and properly positioned",
+            "Fiber routing clean and professional",
+            "Electrical outlet (plug) visible and accessible",
+            "Work area clean and organized",
+            "All equipment properly labeled",
+            "Professional finished appearance",
+        ],
+    ),
+    "step11_active_light": (
+        "active broadband light photo",
+        "Step 11",
+        [
+            "ONT device clearly visible",
+            "Active green lights clearly ON and visible",
+            "Fibertime sticker visible on or near ONT",
+            "Drop number (Drop No.) visible",
+            "No red or error lights showing on device",
+            "Service activation confirmed by visual indicators",
+        ],
+    ),
+    "step12_customer_signature": (
+        "customer signature photo",
+        "Step 12",
+        [
+            "Digital signature clearly visible and readable",
+            "Customer signature clearly present and legible",
+        ],
+    ),
+}
 
-    Respond in JSON format only:
-    {
-        "passed": true/false,
-        "score": 0-10,
-        "issues": ["list of specific problems found"],
-        "confidence": 0.00-1.00,
-        "recommendation": "specific advice for improvement if needed"
-    }
-    """
+INSTALLATION_STEP_PROMPTS = {
+    key: _PROMPT_TEMPLATE.format(
+        subject=subject,
+        step=step,
+        criteria="\n".join(f"    - {c}" for c in criteria),
+    )
+    for key, (subject, step, criteria) in _STEP_SPECS.items()
 }
 
 # Step names - SIMPLE & CLEAR for field agents
@@ -262,3 +183,8 @@ STEP_REQUIREMENTS = {
     11: "📸 Take a photo of the white box with GREEN LIGHTS on + Fibertime sticker + Drop number visible.",
     12: "📸 Take a photo of the client's DIGITAL SIGNATURE."
 }
+
+# Tuple views of the step tables, indexed by step number (index 0 unused),
+# for hot paths that look up a known 1..12 step
+STEP_NAMES_TUPLE = (None,) + tuple(STEP_NAMES[i] for i in range(1, 13))
+STEP_REQUIREMENTS_TUPLE = (None,) + tuple(STEP_REQUIREMENTS[i] for i in range(1, 13))
@@ -1,21 +1,144 @@
-import json
 import os
+import time
+import heapq
+import atexit
 import logging
+import threading
+from collections import Counter
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict, Optional, List
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
+import orjson
 from ..config import Config
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Seconds the background writer waits after a change so a burst of updates
+# (location, photo steps, switches) reaches disk as one write
+SESSION_FLUSH_INTERVAL = 0.5
+
+# The session file is an append-only JSONL log, one {"phone", "session"}
+# record per write; it is rewritten with only the live records once it holds
+# more than SESSION_LOG_COMPACT_FACTOR records per session (with a floor of
+# SESSION_LOG_MIN_RECORDS so small deployments do not compact constantly)
+SESSION_LOG_COMPACT_FACTOR = 4
+SESSION_LOG_MIN_RECORDS = 256
+
+# A session whose only change is a last_activity bump is not re-persisted
+# until its stored last_activity is at least this old; activity freshness
+# within the window does not need to survive a crash
+ACTIVITY_PERSIST_INTERVAL = timedelta(seconds=30)
+
+_from_iso = datetime.fromisoformat
+_now = datetime.now
+
+_WA_PREFIX = 'whatsapp:'
+
+# completed_photos is indexed by step number (1..12); slot 0 is unused
+STEP_SLOTS = 13
+
+
+def _photos_from_steps(steps: Dict) -> List[Optional[str]]:
+    """Convert a {step: photo_path} dict (pre-bitmask format) to a completed_photos list"""
+    photos = [None] * STEP_SLOTS
+    for step, photo_path in steps.items():
+        step = int(step)
+        if 0 < step < STEP_SLOTS:
+            photos[step] = photo_path
+    return photos
+
+
+def _mask_of(photos: List[Optional[str]]) -> int:
+    """Completed-step bitmask (bit n = step n) for a completed_photos list"""
+    mask = 0
+    for step, photo_path in enumerate(photos):
+        if photo_path is not None:
+            mask |= 1 << step
+    return mask
+
+
+def _location_from_dict(location_data: Dict) -> Dict:
+    """Rename an older 'timestamp' (ISO string) in stored location data to
+    'timestamp_ns' (epoch nanoseconds, as the bot now writes it)"""
+    if location_data and 'timestamp' in location_data and 'timestamp_ns' not in location_data:
+        try:
+            stamp = _from_iso(location_data['timestamp'])
+        except (TypeError, ValueError):
+            return location_data
+        del location_data['timestamp']
+        location_data['timestamp_ns'] = int(stamp.timestamp()) * 1_000_000_000 + stamp.microsecond * 1000
+    return location_data
+
+
+@lru_cache(maxsize=4096)
+def normalize_phone_number(phone_number: str) -> str:
+    """Normalize phone number format ('whatsapp:+27...' / '27...' -> '+27...')
+
+    Cached: agents are a small, hot set of numbers, so repeat calls are a
+    single dict lookup.
+    """
+    # Remove WhatsApp prefix and standardize format
+    if phone_number.startswith(_WA_PREFIX):
+        phone_number = phone_number[len(_WA_PREFIX):]
+    if phone_number.startswith('+'):
+        return phone_number
+    return '+' + phone_number
+
+@dataclass(slots=True)
+class InstallationState:
+    """A stashed (not currently active) installation of an agent session"""
+    job_id: Optional[str]
+    current_step: int
+    completed_photos: List[Optional[str]]
+    completed_mask: int
+    dr_number: Optional[str]
+    location_verified: bool
+    location_data: Dict
+    status: str
+    last_activity: Optional[str] = None  # ISO timestamp of when it was stashed
+
+    def to_dict(self):
+        """Convert to dictionary for JSON serialization (shares the nested containers)"""
+        return {
+            'job_id': self.job_id,
+            'current_step': self.current_step,
+            'completed_photos': self.completed_photos,
+            'dr_number': self.dr_number,
+            'location_verified': self.location_verified,
+            'location_data': self.location_data,
+            'status': self.status,
+            'last_activity': self.last_activity,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        """Create from dictionary, rebuilding the completed-step bitmask"""
+        if 'completed_steps' in data:
+            photos = _photos_from_steps(data['completed_steps'] or {})
+        else:
+            photos = data['completed_photos']
+        return cls(
+            job_id=data['job_id'],
+            current_step=data['current_step'],
+            completed_photos=photos,
+            completed_mask=_mask_of(photos),
+            dr_number=data['dr_number'],
+            location_verified=data['location_verified'],
+            location_data=_location_from_dict(data['location_data']),
+            status=data['status'],
+            last_activity=data.get('last_activity'),
+        )
+
+@dataclass(slots=True)
 class AgentSession:
     """Represents an active agent session with multiple installations"""
     agent_id: str
     phone_number: str
     current_job_id: Optional[str] = None
     current_step: int = 0  # 0 = awaiting DR, -1 = awaiting location, 1-12 = photo steps
-    completed_steps: Dict[int, str] = None
+    completed_photos: List[Optional[str]] = None  # photo path per step, None = not done
+    completed_mask: int = 0  # bit n set = step n completed
     session_start: datetime = None
     last_activity: datetime = None
     status: str = "active"  # active, completed, abandoned
@@ -23,177 +146,488 @@ class AgentSession:
     location_verified: bool = False
     location_data: Optional[Dict] = None
     # Multi-installation support
-    installations: Dict[str, Dict] = None  # DR_number -> installation_data
+    installations: Dict[str, InstallationState] = None  # DR_number -> stashed installation, in DR order
     current_dr: Optional[str] = None  # Currently active DR number
     awaiting_dr_input: bool = True
 
     def __post_init__(self):
-        if self.completed_steps is None:
-            self.completed_steps = {}
-        if self.session_start is None:
-            self.session_start = datetime.now()
-        if self.last_activity is None:
-            self.last_activity = datetime.now()
+        if self.completed_photos is None:
+            self.completed_photos = [None] * STEP_SLOTS
+        if self.session_start is None or self.last_activity is None:
+            now = _now()
+            if self.session_start is None:
+                self.session_start = now
+            if self.last_activity is None:
+                self.last_activity = now
         if self.installations is None:
             self.installations = {}
         if self.location_data is None:
             self.location_data = {}
 
     def to_dict(self):
-        """Convert to dictionary for JSON serialization"""
-        data = asdict(self)
-        # Convert datetime objects to ISO strings
-        data['session_start'] = self.session_start.isoformat() if self.session_start else None
-        data['last_activity'] = self.last_activity.isoformat() if self.last_activity else None
-        return data
+        """Convert to dictionary for JSON serialization
+
+        Nested dicts are shared with the session, not copied; serialize the
+        result before the session changes again.
+        """
+        return {
+            'agent_id': self.agent_id,
+            'phone_number': self.phone_number,
+            'current_job_id': self.current_job_id,
+            'current_step': self.current_step,
+            'completed_photos': self.completed_photos,
+            # Convert datetime objects to ISO strings
+            'session_start': self.session_start.isoformat() if self.session_start else None,
+            'last_activity': self.last_activity.isoformat() if self.last_activity else None,
+            'status': self.status,
+            'dr_number': self.dr_number,
+            'location_verified': self.location_verified,
+            'location_data': self.location_data,
+            'installations': {
+                dr_number: install.to_dict() for dr_number, install in self.installations.items()
+            },
+            'current_dr': self.current_dr,
+            'awaiting_dr_input': self.awaiting_dr_input,
+        }
 
     @classmethod
     def from_dict(cls, data: Dict):
         """Create from dictionary with datetime parsing"""
         if data.get('session_start'):
-            data['session_start'] = datetime.fromisoformat(data['session_start'])
+            data['session_start'] = _from_iso(data['session_start'])
         if data.get('last_activity'):
-            data['last_activity'] = datetime.fromisoformat(data['last_activity'])
+            data['last_activity'] = _from_iso(data['last_activity'])
+        # Older files store completed steps as a {"step": photo_path} dict
+        if 'completed_steps' in data:
+            data['completed_photos'] = _photos_from_steps(data.pop('completed_steps') or {})
+        if data.get('completed_photos'):
+            data['completed_mask'] = _mask_of(data['completed_photos'])
+        _location_from_dict(data.get('location_data'))
+        if data.get('installations'):
+            data['installations'] = {
+                dr_number: InstallationState.from_dict(install)
+                for dr_number, install in sorted(data['installations'].items())
+            }
         return cls(**data)
 
+    @property
+    def completed_count(self) -> int:
+        """Number of completed steps"""
+        return self.completed_mask.bit_count()
+
+    def is_step_completed(self, step: int) -> bool:
+        """True if the given step (1..12) has been completed"""
+        return bool(self.completed_mask >> step & 1)
+
+    @property
+    def completed_steps(self) -> Dict[int, str]:
+        """Completed steps as {step: photo_path} (a new dict built on each access;
+        prefer completed_count / completed_photos)"""
+        return {
+            step: photo_path
+            for step, photo_path in enumerate(self.completed_photos)
+            if photo_path is not None
+        }
+
+    @completed_steps.setter
+    def completed_steps(self, steps: Dict) -> None:
+        self.completed_photos = _photos_from_steps(steps or {})
+        self.completed_mask = _mask_of(self.completed_photos)
+
+# Keys update_session may set; anything else (e.g. completed_count) is ignored
+_UPDATABLE_FIELDS = frozenset(f.name for f in fields(AgentSession)) | {'completed_steps'}
+
 class SessionManager:
     """Manages agent sessions and installation jobs"""
 
     def __init__(self, session_file: Optional[str] = None):
         self.session_file = session_file or Config.SESSION_FILE_PATH
         self.sessions: Dict[str, AgentSession] = {}
+        # Write-behind persistence: mutations mark a phone dirty and a
+        # background thread appends those sessions to the log every
+        # SESSION_FLUSH_INTERVAL
+        self._lock = threading.RLock()  # guards sessions and _dirty
+        # Serializes writes to the session log (and _log_records). Records are
+        # snapshotted under _lock but written and fsynced outside it, so disk
+        # syncs don't stall other agents' messages. Order: _write_lock, then
+        # _lock; never take _write_lock while holding _lock
+        self._write_lock = threading.Lock()
+        self._dirty = set()
+        self._flush_wakeup = threading.Event()
+        self._closed = threading.Event()  # set by close(); stops the writer
+        self._flusher = None
+        self._log_records = 0  # lines in the session log, live or superseded
+        # Running totals for get_session_stats; every mutation takes its
+        # session out of them (_uncount) before changing it and adds it
+        # back (_count) afterwards
+        self._status_counts = Counter()
+        self._total_completed_steps = 0
+        # (last_activity, phone) min-heap for the abandoned-session sweep.
+        # Entries are never updated in place: each touch pushes a new one and
+        # superseded entries are skipped when they surface
+        self._activity_heap: List[tuple] = []
+        # (epoch second, formatted local timestamp, IDs issued that second)
+        self._job_stamp = (-1, '', 0)
+        # phone -> last_activity as of the last time the session was queued
+        # for writing (see ACTIVITY_PERSIST_INTERVAL)
+        self._persisted_activity: Dict[str, datetime] = {}
         self._load_sessions()
+        # Don't lose the last SESSION_FLUSH_INTERVAL of changes on shutdown
+        atexit.register(self.flush)
 
     def _load_sessions(self):
-        """Load sessions from file"""
+        """Load sessions by replaying the session log (last record per phone wins)"""
         try:
             if os.path.exists(self.session_file):
-                with open(self.session_file, 'r') as f:
-                    data = json.load(f)
-                    for phone_number, session_data in data.items():
-                        self.sessions[phone_number] = AgentSession.from_dict(session_data)
+                with open(self.session_file, 'rb') as f:
+                    raw = f.read()
+                if raw[:2] in (b'{\n', b'{}'):
+                    # Pre-JSONL format: one indented object of phone -> session
+                    data = orjson.loads(raw)
+                    self._log_records = -1  # force a rewrite as JSONL below
+                else:
+                    data = {}
+                    for line in raw.splitlines():
+                        if not line:
+                            continue
+                        try:
+                            record = orjson.loads(line)
+                        except orjson.JSONDecodeError:
+                            # Torn append from a crash mid-write: drop the line
+                            # and rewrite a clean log below
+                            logger.warning("Skipping unreadable session log line")
+                            self._log_records = -1
+                            continue
+                        data[record["phone"]] = record["session"]
+                        if self._log_records >= 0:
+                            self._log_records += 1
+                for phone_number, session_data in data.items():
+                    self.sessions[phone_number] = AgentSession.from_dict(session_data)
                 logger.info(f"Loaded {len(self.sessions)} sessions from file")
+                if self._needs_compaction():
+                    self._compact_sessions()
         except Exception as e:
             logger.error(f"Error loading sessions: {e}")
             self.sessions = {}
 
-    def _save_sessions(self):
-        """Save sessions to file"""
+        for phone_number, session in self.sessions.items():
+            self._count(session)
+            self._persisted_activity[phone_number] = session.last_activity
+        self._rebuild_activity_heap()
+
+    def _rebuild_activity_heap(self):
+        """Rebuild the activity heap with one entry per session"""
+        self._activity_heap = [
+            (session.last_activity, phone_number)
+            for phone_number, session in self.sessions.items()
+        ]
+        heapq.heapify(self._activity_heap)
+
+    def _touch(self, phone_number: str, session: AgentSession, now: datetime):
+        """Record activity on a session (call with _lock held)"""
+        session.last_activity = now
+        heapq.heappush(self._activity_heap, (now, phone_number))
+        # Busy agents push many entries per sweep window; drop the stale ones
+        if len(self._activity_heap) > 4 * len(self.sessions) + 64:
+            self._rebuild_activity_heap()
+
+    def _count(self, session: AgentSession):
+        """Add a session to the running stats totals"""
+        self._status_counts[session.status] += 1
+        self._total_completed_steps += session.completed_count
+
+    def _uncount(self, session: AgentSession):
+        """Take a session out of the running stats totals"""
+        self._status_counts[session.status] -= 1
+        self._total_completed_steps -= session.completed_count
+
+    @staticmethod
+    def _session_record(phone_number: str, session: AgentSession) -> bytes:
+        """One session log line"""
+        return orjson.dumps(
+            {"phone": phone_number, "session": session.to_dict()},
+            option=orjson.OPT_APPEND_NEWLINE
+        )
+
+    def _needs_compaction(self) -> bool:
+        """True once superseded records dominate the session log"""
+        return (self._log_records < 0 or
+                self._log_records > SESSION_LOG_COMPACT_FACTOR * max(len(self.sessions), SESSION_LOG_MIN_RECORDS))
+
+    def _compact_sessions(self, sync: bool = False):
+        """Rewrite the session log with one record per session (call with
+        _write_lock held, or from __init__)
+
+        Written to a temp file in the same directory and renamed over the log,
+        so a crash leaves either the old or the new file, never a torn one.
+        Returns True if the new log is in place.
+        """
+        with self._lock:
+            data = b''.join(
+                self._session_record(phone_number, session)
+                for phone_number, session in self.sessions.items()
+            )
+            count = len(self.sessions)
         try:
-            # Ensure directory exists
             os.makedirs(os.path.dirname(self.session_file), exist_ok=True)
-
-            with open(self.session_file, 'w') as f:
-                data = {
-                    phone_number: session.to_dict()
-                    for phone_number, session in self.sessions.items()
-                }
-                json.dump(data, f, indent=2)
+            tmp_path = self.session_file + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.session_file)
+            self._log_records = count
+            return True
         except Exception as e:
-            logger.error(f"Error saving sessions: {e}")
+            logger.error(f"Error compacting sessions: {e}")
+            return False
+
+    def _mark_dirty(self, phone_number: str):
+        """Queue a changed session for the background writer"""
+        with self._lock:
+            self._dirty.add(phone_number)
+            session = self.sessions.get(phone_number)
+            if session is not None:
+                self._persisted_activity[phone_number] = session.last_activity
+            # After close() changes stay queued until an explicit flush()
+            if self._closed.is_set():
+                return
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, name="session-writer", daemon=True
+                )
+                self._flusher.start()
+        self._flush_wakeup.set()
+
+    def _flush_dirty(self, sync: bool = False):
+        """Append sessions changed since the last write to the session log
+
+        Args:
+            sync: fsync the data before returning (explicit flushes only;
+                the periodic background writes leave it to the OS)
+        """
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                dirty = self._dirty
+                self._dirty = set()
+                # Most sessions changed: one rewrite beats appending them all
+                compact = 2 * len(dirty) >= len(self.sessions)
+                if not compact:
+                    records = [
+                        self._session_record(phone_number, self.sessions[phone_number])
+                        for phone_number in dirty
+                        if phone_number in self.sessions
+                    ]
+
+            if compact:
+                saved = self._compact_sessions(sync)
+            else:
+                try:
+                    # Ensure directory exists
+                    os.makedirs(os.path.dirname(self.session_file), exist_ok=True)
+
+                    with open(self.session_file, 'ab') as f:
+                        f.write(b''.join(records))
+                        if sync:
+                            f.flush()
+                            os.fsync(f.fileno())
+                    self._log_records += len(records)
+                    saved = True
+                except Exception as e:
+                    logger.error(f"Error saving sessions: {e}")
+                    saved = False
+
+            if not saved:
+                # Requeue the phones so the next flush retries them
+                with self._lock:
+                    self._dirty |= dirty
+                return
+            if self._needs_compaction():
+                self._compact_sessions(sync)
+
+    def flush(self):
+        """Write pending session changes to disk now and fsync them"""
+        self._flush_dirty(sync=True)
+
+    def close(self):
+        """Stop the background writer and write out pending changes
+
+        Also drops the atexit hook, so a closed manager (tests, scripts) is
+        not kept alive until interpreter exit. Do not call with _lock held.
+        """
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flush_wakeup.set()
+        atexit.unregister(self.flush)
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def _flush_loop(self):
+        """Background writer: coalesce changes for SESSION_FLUSH_INTERVAL, then save"""
+        while not self._closed.is_set():
+            self._flush_wakeup.wait()
+            # close() cuts the coalescing delay short; it flushes what is left
+            self._closed.wait(SESSION_FLUSH_INTERVAL)
+            self._flush_wakeup.clear()
+            self._flush_dirty()
 
     def get_or_create_session(self, phone_number: str, agent_id: Optional[str] = None) -> AgentSession:
         """Get existing session or create new one"""
-        phone_number = self._normalize_phone_number(phone_number)
-
-        if phone_number not in self.sessions:
-            # Clean up old sessions
-            self._cleanup_old_sessions()
-
-            # Create new session
-            agent_id = agent_id or self._generate_agent_id(phone_number)
-            job_id = self._generate_job_id(agent_id)
-
-            self.sessions[phone_number] = AgentSession(
-                agent_id=agent_id,
-                phone_number=phone_number,
-                current_job_id=job_id,
-                current_step=0,  # Start with DR collection
-                completed_steps={},
-                session_start=datetime.now(),
-                last_activity=datetime.now(),
-                status="active",
-                dr_number=None,
-                location_verified=False,
-                location_data={},
-                installations={},
-                current_dr=None,
-                awaiting_dr_input=True
-            )
+        with self._lock:
+            phone_number = self._normalize_phone_number(phone_number)
+            now = _now()
+
+            created = phone_number not in self.sessions
+            if created:
+                # Clean up old sessions
+                self._cleanup_old_sessions(now)
+
+                # Create new session
+                agent_id = agent_id or self._generate_agent_id(phone_number)
+                job_id = self._generate_job_id(agent_id)
+
+                self.sessions[phone_number] = AgentSession(
+                    agent_id=agent_id,
+                    phone_number=phone_number,
+                    current_job_id=job_id,
+                    current_step=0,  # Start with DR collection
+                    completed_photos=[None] * STEP_SLOTS,
+                    completed_mask=0,
+                    session_start=now,
+                    last_activity=now,
+                    status="active",
+                    dr_number=None,
+                    location_verified=False,
+                    location_data={},
+                    installations={},
+                    current_dr=None,
+                    awaiting_dr_input=True
+                )
+                self._count(self.sessions[phone_number])
+
+                logger.info(f"Created new session for {phone_number}")
+
+            # Update last activity; a bare bump is only written out once the
+            # stored value is ACTIVITY_PERSIST_INTERVAL old
+            session = self.sessions[phone_number]
+            self._touch(phone_number, session, now)
+            persisted = self._persisted_activity.get(phone_number)
+            if created or persisted is None or now - persisted >= ACTIVITY_PERSIST_INTERVAL:
+                self._mark_dirty(phone_number)
 
-            logger.info(f"Created new session for {phone_number}")
-            self._save_sessions()
+            return session
 
-        # Update last activity
-        session = self.sessions[phone_number]
-        session.last_activity = datetime.now()
-        self._save_sessions()
+    def _tracked_phone(self, phone_number: str) -> Optional[str]:
+        """Return the session key for phone_number, or None if it has no session
 
-        return session
+        Session keys are already normalized, so an exact hit skips
+        normalization; unknown numbers (stray webhook traffic) let the
+        mutators return before taking the lock.
+        """
+        if phone_number in self.sessions:
+            return phone_number
+        phone_number = self._normalize_phone_number(phone_number)
+        return phone_number if phone_number in self.sessions else None
 
     def get_session(self, phone_number: str) -> Optional[AgentSession]:
         """Get existing session if exists"""
         phone_number = self._normalize_phone_number(phone_number)
         return self.sessions.get(phone_number)
 
-    def update_session(self, phone_number: str, **kwargs):
-        """Update session with new values"""
-        phone_number = self._normalize_phone_number(phone_number)
-
-        if phone_number in self.sessions:
-            session = self.sessions[phone_number]
-            for key, value in kwargs.items():
-                if hasattr(session, key):
+    def update_session(self, phone_number: str, **kwargs) -> Optional[AgentSession]:
+        """Update session with new values and return it (None if no session)"""
+        phone_number = self._tracked_phone(phone_number)
+        if phone_number is None:
+            return None
+
+        with self._lock:
+            session = self.sessions.get(phone_number)
+            if session is not None:
+                updates = [(key, value) for key, value in kwargs.items() if key in _UPDATABLE_FIELDS]
+                self._uncount(session)
+                for key, value in updates:
                     setattr(session, key, value)
-            session.last_activity = datetime.now()
-            self._save_sessions()
-            logger.info(f"Updated session for {phone_number}")
-
-    def complete_step(self, phone_number: str, step: int, photo_path: str):
-        """Mark a step as completed"""
-        phone_number = self._normalize_phone_number(phone_number)
-
-        if phone_number in self.sessions:
-            session = self.sessions[phone_number]
-            session.completed_steps[step] = photo_path
+                self._count(session)
+                self._touch(phone_number, session, _now())
+                self._mark_dirty(phone_number)
+                logger.info(f"Updated session for {phone_number}")
+                return session
+            return None
+
+    def complete_step(self, phone_number: str, step: int, photo_path: str) -> Optional[AgentSession]:
+        """Mark a step as completed and return the updated session
+        (None if no session or the step is not 1..12)"""
+        if not 0 < step < STEP_SLOTS:
+            logger.warning("Ignoring completion of invalid step %s for %s", step, phone_number)
+            return None
+        phone_number = self._tracked_phone(phone_number)
+        if phone_number is None:
+            return None
+
+        with self._lock:
+            session = self.sessions.get(phone_number)
+            if session is None:
+                return None
+            self._uncount(session)
+            session.completed_photos[step] = photo_path
+            session.completed_mask |= 1 << step
 
             # Move to next step if this is the current step
             if session.current_step == step:
                 session.current_step = step + 1
 
-            # Check if installation is complete
-            if session.current_step > 12:
+            self._touch(phone_number, session, _now())
+            self._mark_dirty(phone_number)
+
+            # Check if installation is complete; written through below
+            completed = session.current_step > 12
+            if completed:
                 session.status = "completed"
                 logger.info(f"Installation {session.current_job_id} completed for {phone_number}")
+            self._count(session)
 
-            session.last_activity = datetime.now()
-            self._save_sessions()
-
-    def reset_session(self, phone_number: str):
-        """Reset session to start new installation"""
-        phone_number = self._normalize_phone_number(phone_number)
+        if completed:
+            # fsync outside _lock so other agents aren't blocked on the disk
+            self.flush()
+        return session
 
-        if phone_number in self.sessions:
-            session = self.sessions[phone_number]
-            agent_id = session.agent_id
-            job_id = self._generate_job_id(agent_id)
-
-            # Reset session but keep agent info
-            session.current_job_id = job_id
-            session.current_step = 0  # Start with DR collection
-            session.completed_steps = {}
-            session.session_start = datetime.now()
-            session.last_activity = datetime.now()
-            session.status = "active"
-            session.dr_number = None
-            session.location_verified = False
-            session.location_data = {}
-            session.installations = {}
-            session.current_dr = None
-            session.awaiting_dr_input = True
-
-            logger.info(f"Reset session for {phone_number} with new job {job_id}")
-            self._save_sessions()
+    def reset_session(self, phone_number: str) -> Optional[AgentSession]:
+        """Reset session to start new installation and return it (None if no session)"""
+        with self._lock:
+            phone_number = self._normalize_phone_number(phone_number)
+
+            if phone_number in self.sessions:
+                session = self.sessions[phone_number]
+                self._uncount(session)
+                agent_id = session.agent_id
+                job_id = self._generate_job_id(agent_id)
+
+                # Reset session but keep agent info
+                session.current_job_id = job_id
+                session.current_step = 0  # Start with DR collection
+                session.completed_photos = [None] * STEP_SLOTS
+                session.completed_mask = 0
+                now = _now()
+                session.session_start = now
+                self._touch(phone_number, session, now)
+                session.status = "active"
+                session.dr_number = None
+                session.location_verified = False
+                session.location_data = {}
+                session.installations = {}
+                session.current_dr = None
+                session.awaiting_dr_input = True
+                self._count(session)
+
+                logger.info(f"Reset session for {phone_number} with new job {job_id}")
+                self._mark_dirty(phone_number)
+                return session
+            return None
 
     def get_active_sessions(self) -> List[AgentSession]:
         """Get all active sessions"""
@@ -203,147 +637,174 @@ class SessionManager:
         ]
 
     def get_session_stats(self) -> Dict:
-        """Get session statistics"""
-        total_sessions = len(self.sessions)
-        active_sessions = len(self.get_active_sessions())
-        completed_sessions = len([
-            s for s in self.sessions.values() if s.status == "completed"
-        ])
-
+        """Get session statistics (from running totals, no scan)"""
         return {
-            "total_sessions": total_sessions,
-            "active_sessions": active_sessions,
-            "completed_sessions": completed_sessions,
+            "total_sessions": len(self.sessions),
+            "active_sessions": self._status_counts["active"],
+            "completed_sessions": self._status_counts["completed"],
             "average_steps_completed": self._get_average_steps_completed()
         }
 
-    def _normalize_phone_number(self, phone_number: str) -> str:
-        """Normalize phone number format"""
-        # Remove WhatsApp prefix and normalize format
-        normalized = phone_number.replace('whatsapp:', '').replace('+', '')
-        return f"+{normalized}" if not normalized.startswith('+') else normalized
+    _normalize_phone_number = staticmethod(normalize_phone_number)
 
     def _generate_agent_id(self, phone_number: str) -> str:
         """Generate agent ID from phone number"""
         return phone_number.replace('+', '').replace('whatsapp:', '')
 
 
-    def _cleanup_old_sessions(self):
-        """Remove sessions older than 24 hours"""
-        cutoff_time = datetime.now() - timedelta(hours=Config.MAX_SESSION_DURATION_HOURS)
-        old_sessions = [
-            phone for phone, session in self.sessions.items()
-            if session.last_activity < cutoff_time
-        ]
-
-        for phone in old_sessions:
-            session = self.sessions[phone]
+    def _cleanup_old_sessions(self, now: Optional[datetime] = None):
+        """Remove sessions older than 24 hours (call with _lock held)"""
+        cutoff_time = (now or _now()) - timedelta(hours=Config.MAX_SESSION_DURATION_HOURS)
+        heap = self._activity_heap
+        while heap and heap[0][0] < cutoff_time:
+            last_activity, phone = heapq.heappop(heap)
+            session = self.sessions.get(phone)
+            if session is None or session.last_activity != last_activity or session.status == "abandoned":
+                continue  # superseded by later activity, or already swept
+            self._status_counts[session.status] -= 1
             session.status = "abandoned"
+            self._status_counts[session.status] += 1
             logger.info(f"Marked session for {phone} as abandoned")
-
-        if old_sessions:
-            self._save_sessions()
+            self._mark_dirty(phone)
 
     def switch_to_dr(self, phone_number: str, dr_number: str) -> bool:
-        """Switch to or create installation with specific DR number"""
-        phone_number = self._normalize_phone_number(phone_number)
-        dr_number = dr_number.strip().upper()
-        
-        if phone_number not in self.sessions:
-            return False
-            
-        session = self.sessions[phone_number]
-        
-        # Check installation limit (10 max)
-        if dr_number not in session.installations and len(session.installations) >= 10:
-            logger.warning(f"Installation limit reached for {phone_number}")
-            return False
-        
-        # Save current installation state if exists (and not switching to same DR)
-        if session.current_dr and session.current_dr != dr_number:
-            session.installations[session.current_dr] = {
-                "job_id": session.current_job_id,
-                "current_step": session.current_step,
-                "completed_steps": session.completed_steps.copy(),
-                "dr_number": session.dr_number,
-                "location_verified": session.location_verified,
-                "location_data": session.location_data.copy(),
-                "status": session.status,
-                "last_activity": datetime.now().isoformat()
-            }
-        
-        # Switch to or create new installation
-        if dr_number in session.installations:
-            # Load existing installation
-            install = session.installations[dr_number]
-            session.current_job_id = install["job_id"]
-            session.current_step = install["current_step"]
-            session.completed_steps = install["completed_steps"].copy()
-            session.dr_number = install["dr_number"]
-            session.location_verified = install["location_verified"]
-            session.location_data = install["location_data"].copy()
-            session.status = install["status"]
-        else:
-            # Create new installation
-            job_id = self._generate_job_id(session.agent_id, dr_number)
-            session.current_job_id = job_id
-            session.current_step = -1  # Awaiting location
-            session.completed_steps = {}
-            session.dr_number = dr_number
-            session.location_verified = False
-            session.location_data = {}
-            session.status = "active"
-            
-        session.current_dr = dr_number
-        session.awaiting_dr_input = False
-        session.last_activity = datetime.now()
-        self._save_sessions()
-        
-        logger.info(f"Switched to DR {dr_number} for {phone_number}")
-        return True
-    
+        """Switch to or create installation with specific DR number
+
+        dr_number must already be normalized (stripped, upper-case); the bot
+        does that once when it validates the agent's input.
+        """
+        with self._lock:
+            phone_number = self._normalize_phone_number(phone_number)
+
+            if phone_number not in self.sessions:
+                return False
+
+            session = self.sessions[phone_number]
+            stash = session.installations
+
+            # Check installation limit (10 max)
+            if (dr_number != session.current_dr and dr_number not in stash
+                    and len(stash) >= 10):
+                logger.warning(f"Installation limit reached for {phone_number}")
+                return False
+
+            now = _now()
+            self._uncount(session)
+
+            # Save current installation state if exists (and not switching to same DR).
+            # The dicts move into the stash as-is: the session gets fresh or
+            # restored ones below, so nothing else holds a reference to them
+            if session.current_dr and session.current_dr != dr_number:
+                out_of_order = bool(stash) and session.current_dr < next(reversed(stash))
+                stash[session.current_dr] = InstallationState(
+                    job_id=session.current_job_id,
+                    current_step=session.current_step,
+                    completed_photos=session.completed_photos,
+                    completed_mask=session.completed_mask,
+                    dr_number=session.dr_number,
+                    location_verified=session.location_verified,
+                    location_data=session.location_data,
+                    status=session.status,
+                    last_activity=now.isoformat()
+                )
+                if out_of_order:
+                    # Keep the stash in DR order so listing never has to sort
+                    ordered = sorted(stash.items())
+                    stash.clear()
+                    stash.update(ordered)
+
+            # Switch to or create new installation
+            if dr_number == session.current_dr:
+                pass  # Already the active installation
+            elif dr_number in stash:
+                # Load existing installation; the active session owns its
+                # dicts until the next switch stashes them again
+                install = stash.pop(dr_number)
+                session.current_job_id = install.job_id
+                session.current_step = install.current_step
+                session.completed_photos = install.completed_photos
+                session.completed_mask = install.completed_mask
+                session.dr_number = install.dr_number
+                session.location_verified = install.location_verified
+                session.location_data = install.location_data
+                session.status = install.status
+            else:
+                # Create new installation
+                job_id = self._generate_job_id(session.agent_id, dr_number)
+                session.current_job_id = job_id
+                session.current_step = -1  # Awaiting location
+                session.completed_photos = [None] * STEP_SLOTS
+                session.completed_mask = 0
+                session.dr_number = dr_number
+                session.location_verified = False
+                session.location_data = {}
+                session.status = "active"
+            self._count(session)
+
+            session.current_dr = dr_number
+            session.awaiting_dr_input = False
+            self._touch(phone_number, session, now)
+            self._mark_dirty(phone_number)
+
+            logger.info(f"Switched to DR {dr_number} for {phone_number}")
+            return True
+
     def get_installation_list(self, phone_number: str) -> List[Dict]:
         """Get list of all installations for an agent"""
         phone_number = self._normalize_phone_number(phone_number)
-        
+
         if phone_number not in self.sessions:
             return []
-            
+
         session = self.sessions[phone_number]
         installations = []
-        
-        # Add current installation if it exists
+
+        # Current installation, merged into the (already DR-ordered) stash below
+        current_install = None
         if session.current_dr:
             current_install = {
                 "dr_number": session.current_dr,
                 "job_id": session.current_job_id,
                 "current_step": session.current_step,
-                "completed_count": len(session.completed_steps),
-                "progress_percent": (len(session.completed_steps) / 12) * 100,
+                "completed_count": session.completed_count,
+                "progress_percent": (session.completed_count / 12) * 100,
                 "status": session.status,
                 "is_current": True
             }
-            installations.append(current_install)
-        
+
         # Add other installations
         for dr, install_data in session.installations.items():
+            if current_install is not None and session.current_dr < dr:
+                installations.append(current_install)
+                current_install = None
             if dr != session.current_dr:  # Don't duplicate current
                 install_info = {
                     "dr_number": dr,
-                    "job_id": install_data["job_id"],
-                    "current_step": install_data["current_step"],
-                    "completed_count": len(install_data["completed_steps"]),
-                    "progress_percent": (len(install_data["completed_steps"]) / 12) * 100,
-                    "status": install_data["status"],
+                    "job_id": install_data.job_id,
+                    "current_step": install_data.current_step,
+                    "completed_count": install_data.completed_mask.bit_count(),
+                    "progress_percent": (install_data.completed_mask.bit_count() / 12) * 100,
+                    "status": install_data.status,
                     "is_current": False
                 }
                 installations.append(install_info)
-                
-        return sorted(installations, key=lambda x: x["dr_number"])
-    
+        if current_install is not None:
+            installations.append(current_install)
+
+        return installations
+
     def _generate_job_id(self, agent_id: str, dr_number: str = None) -> str:
-        """Generate unique job ID with optional DR number"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        """Generate unique job ID with optional DR number (call with _lock held)"""
+        second = int(time.time())
+        stamp_second, stamp, count = self._job_stamp
+        if second == stamp_second:
+            count += 1
+        else:
+            stamp, count = time.strftime('%Y%m%d_%H%M%S', time.localtime(second)), 0
+        self._job_stamp = (second, stamp, count)
+        # Later IDs within the same second get a -N suffix so a quick
+        # RESET/START cannot reuse the job ID a pending verification expects
+        timestamp = f"{stamp}-{count}" if count else stamp
         if dr_number:
             return f"JOB_{timestamp}_{agent_id}_{dr_number}"
         return f"JOB_{timestamp}_{agent_id}"
@@ -353,5 +814,4 @@ class SessionManager:
         if not self.sessions:
             return 0
 
-        total_steps = sum(len(session.completed_steps) for session in self.sessions.values())
-        return round(total_steps / len(self.sessions), 1)
+        return round(self._total_completed_steps / len(self.sessions), 1)
@@ -1,6 +1,6 @@
 import os
 import base64
-import json
+import orjson
 import logging
 from typing import Dict, List, Optional
 from dataclasses import dataclass
@@ -129,7 +129,7 @@ class FiberInstallationVerifier:
                 # Try to parse JSON response (remove markdown if present)
                 if result_text.startswith('```json'):
                     result_text = result_text.replace('```json', '').replace('```', '').strip()
-                result_json = json.loads(result_text)
+                result_json = orjson.loads(result_text)
 
                 # Extract values from AI response
                 score = min(max(result_json.get('score', 0), 0), 10)  # Clamp 0-10
@@ -151,7 +151,7 @@ class FiberInstallationVerifier:
                     recommendation=recommendation
                 )
 
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 logger.warning(f"Failed to parse JSON response for step {step_number}: {result_text}")
 
                 # Fallback parsing if JSON fails
@@ -5,102 +5,48 @@ Test script to verify fiber installation bot workflow
 import sys
 sys.path.append('.')
 
-from src.bot.bot import FiberInstallationBot
+import pytest
 
-def test_bot_commands():
+# The module-scoped `bot` fixture lives in conftest.py
+
+def test_bot_commands(bot):
     """Test basic bot command handling"""
-    print("🔧 Testing Fiber Installation Bot Workflow")
-    print("=" * 50)
-    
-    bot = FiberInstallationBot()
     test_phone = "+27123456789"
-    
-    # Test greeting
-    print("\n1. Testing HELLO command:")
-    response = bot.process_message(test_phone, "HELLO")
-    print(f"Response: {response[:100]}...")
-    
-    # Test START command
-    print("\n2. Testing START command:")
-    response = bot.process_message(test_phone, "START")
-    print(f"Response: {response[:100]}...")
-    
-    # Test STATUS command  
-    print("\n3. Testing STATUS command:")
-    response = bot.process_message(test_phone, "STATUS")
-    print(f"Response: {response[:100]}...")
-    
-    # Test HELP command
-    print("\n4. Testing HELP command:")
-    response = bot.process_message(test_phone, "HELP")
-    print(f"Response: {response[:100]}...")
-    
-    # Test unknown command
-    print("\n5. Testing unknown command:")
-    response = bot.process_message(test_phone, "RANDOM_COMMAND")
-    print(f"Response: {response[:100]}...")
-    
-    # Test current bot stats
-    print("\n6. Current bot statistics:")
+    bot.session_manager.reset_session(test_phone)
+
+    for command in ["HELLO", "START", "STATUS", "HELP", "RANDOM_COMMAND"]:
+        response = bot.process_message(test_phone, command)
+        assert isinstance(response, str) and response, f"No response to {command}"
+
     stats = bot.get_bot_stats()
-    for key, value in stats.items():
-        print(f"  {key}: {value}")
+    assert stats["total_sessions"] >= 1
 
 def test_ai_verification():
-    """Test AI verification with a mock image"""
-    print("\n🔍 Testing AI Photo Verification")
-    print("=" * 50)
-    
-    try:
-        from src.verifier import FiberInstallationVerifier
-        verifier = FiberInstallationVerifier()
-        
-        # Test with step 1 (this will use the actual OpenAI API)
-        print("Testing step 1 verification with mock data...")
-        print("Note: This would normally require an actual image file")
-        print("Skipping AI test to avoid API costs")
-        
-    except Exception as e:
-        print(f"AI verification setup error: {e}")
-        
-def test_session_management():
+    """Test AI verification setup (no API call, to avoid costs)"""
+    from src.verifier import FiberInstallationVerifier
+    verifier = FiberInstallationVerifier(api_key="test-key")
+    assert verifier.client is not None
+
+def test_session_management(bot):
     """Test session management"""
-    print("\n📋 Testing Session Management")
-    print("=" * 50)
-    
-    from src.storage.sessions import SessionManager
-    
-    session_manager = SessionManager()
+    session_manager = bot.session_manager
     test_phone = "+27999888777"
-    
-    # Create session
-    print("Creating new session...")
+    session_manager.reset_session(test_phone)
+
     session = session_manager.get_or_create_session(test_phone)
-    print(f"Created session for agent {session.agent_id} with job {session.current_job_id}")
-    
-    # Test step completion
-    print("Completing step 1...")
+    assert session.current_job_id
+    start_step = session.current_step
+
     session_manager.complete_step(test_phone, 1, "test_photo.jpg")
-    
+
+    # A fresh session is still awaiting its DR number, so it stays on its step
     updated_session = session_manager.get_session(test_phone)
-    print(f"Current step: {updated_session.current_step}")
-    print(f"Completed steps: {list(updated_session.completed_steps.keys())}")
-    
-    # Get session stats
+    assert updated_session.current_step == start_step
+    assert updated_session.completed_count == 1
+    assert updated_session.completed_photos[1] == "test_photo.jpg"
+
     stats = session_manager.get_session_stats()
-    print(f"Session stats: {stats}")
+    assert stats["total_sessions"] >= 1
 
 if __name__ == "__main__":
-    print("🚀 Starting Bot Tests")
-    
-    try:
-        test_bot_commands()
-        test_session_management()
-        test_ai_verification()
-        
-        print("\n✅ All tests completed successfully!")
-        
-    except Exception as e:
-        print(f"\n❌ Test failed: {e}")
-        import traceback
-        traceback.print_exc()
\ No newline at end of file
+    pytest.main([__file__])
@@ -35,7 +35,7 @@ def main():
 
     st.sidebar.markdown("---")
     st.sidebar.metric("Current Step", session.current_step)
-    st.sidebar.metric("Completed Steps", len(session.completed_steps))
+    st.sidebar.metric("Completed Steps", session.completed_count)
 
     # Main interface
     col1, col2 = st.columns([2, 1])
@@ -129,14 +129,14 @@ def main():
         st.header("📋 Progress")
 
         # Progress bar
-        progress = len(session.completed_steps) / 14
+        progress = session.completed_count / 14
         st.progress(progress)
-        st.write(f"**{len(session.completed_steps)}/14** steps completed")
+        st.write(f"**{session.completed_count}/14** steps completed")
 
         # Step checklist
         st.subheader("Completed Steps:")
         for step_num in range(1, 15):
-            status = "✅" if step_num in session.completed_steps else "⏳"
+            status = "✅" if session.is_step_completed(step_num) else "⏳"
             step_name = verifier._get_step_name(step_num)
             st.write(f"{status} Step {step_num}: {step_name}")
 
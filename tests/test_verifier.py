@@ -1,9 +1,17 @@
 import pytest
-import tempfile
-import os
 from unittest.mock import Mock, patch, MagicMock
 from src.verifier import FiberInstallationVerifier, VerificationResult
 
+# Smallest decodable JPEG (1x1 greyscale) so fixtures don't pay for PIL encoding
+MIN_JPEG = (
+    b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+    b'\xff\xdb\x00C\x00' + b'\xff' * 64 +
+    b'\xff\xc0\x00\x0b\x08\x00\x01\x00\x01\x01\x01\x11\x00'
+    b'\xff\xc4\x00\x14\x00\x01' + b'\x00' * 15 + b'\x03'
+    b'\xff\xc4\x00\x14\x10\x01' + b'\x00' * 16 +
+    b'\xff\xda\x00\x08\x01\x01\x00\x00?\x007\xff\xd9'
+)
+
 class TestFiberInstallationVerifier:
     """Test suite for FiberInstallationVerifier"""
 
@@ -17,16 +25,12 @@ class TestFiberInstallationVerifier:
             verifier.client = mock_client
             return verifier
 
-    @pytest.fixture
-    def sample_image(self):
-        """Create a temporary image file for testing"""
-        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-            # Create a simple test image (1x1 pixel JPEG)
-            from PIL import Image
-            img = Image.new('RGB', (100, 100), color='red')
-            img.save(temp_file.name, 'JPEG')
-            yield temp_file.name
-        os.unlink(temp_file.name)
+    @pytest.fixture(scope="session")
+    def sample_image(self, tmp_path_factory):
+        """Create a temporary image file once for the whole test run"""
+        path = tmp_path_factory.mktemp("images") / "sample.jpg"
+        path.write_bytes(MIN_JPEG)
+        return str(path)
 
     def test_init_with_api_key(self):
         """Test verifier initialization with API key"""
@@ -130,28 +134,16 @@ class TestFiberInstallationVerifier:
         mock_response.choices[0].message.content = '{"passed": true, "score": 8, "issues": [], "confidence": 0.9, "recommendation": "Good"}'
         verifier.client.chat.completions.create.return_value = mock_response
 
-        # Create temporary copies of sample image
-        photos = {}
-        for step in [1, 2, 3]:
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-                from PIL import Image
-                img = Image.new('RGB', (100, 100), color='blue')
-                img.save(temp_file.name, 'JPEG')
-                photos[step] = temp_file.name
-
-        try:
-            result = verifier.verify_installation_batch(photos)
-
-            assert "overall_score" in result
-            assert "completion_rate" in result
-            assert "status" in result
-            assert "results" in result
-            assert len(result["results"]) == 3
-
-        finally:
-            # Clean up temporary files
-            for photo_path in photos.values():
-                os.unlink(photo_path)
+        # The verifier only reads the photos, so every step can share one file
+        photos = {step: sample_image for step in [1, 2, 3]}
+
+        result = verifier.verify_installation_batch(photos)
+
+        assert "overall_score" in result
+        assert "completion_rate" in result
+        assert "status" in result
+        assert "results" in result
+        assert len(result["results"]) == 3
 
     def test_verify_installation_batch_missing_file(self, verifier):
         """Test batch verification with missing photo files"""